@@ -0,0 +1,52 @@
+#%%
+from typing import Dict, Sequence
+
+import audio_classifier.train.collate.base as base_collate
+import audio_classifier.train.config.loader as conf_loader
+import audio_classifier.train.data.dataset.base as dataset_base
+import audio_classifier.train.data.metadata.query as metadata_query
+import audio_classifier.train.data.metadata.reader as metadata_reader
+from joblib import Parallel, delayed
+from script.train import train_common
+from script.train.classification.svm import train_pca_svc
+
+#%%
+METADATA_PATH: str = "../../test_dataset/metadata.csv"
+FOLDER_DATASET_PATH: str = "../../test_dataset/folder_dataset"
+N_JOBS: int = 2
+
+#%%
+metadata: Sequence[Dict[str, str]] = metadata_reader.read_csv_metadata(
+    path_to_metadata=METADATA_PATH)
+query = metadata_query.DictMetaDataQuerier(metadata=metadata,
+                                           filename_key="slice_file_name",
+                                           label_key="classID")
+loader_config = conf_loader.LoaderConfig(num_workers=2 * N_JOBS,
+                                         batch_size=2)
+
+
+#%%
+def load_fold(curr_val_fold: int) -> int:
+    fold_loader_config = train_pca_svc.get_fold_loader_config(
+        loader_config=loader_config, n_jobs=N_JOBS)
+    assert fold_loader_config.num_workers > 0
+    dataset = dataset_base.FolderDataset(folder_path=FOLDER_DATASET_PATH,
+                                         sample_rate=44100,
+                                         filename_to_label_func=query,
+                                         cache=False)
+    loader = train_common.get_data_loader(
+        dataset=dataset,
+        collate_function=base_collate.identity_collate_function,
+        loader_config=fold_loader_config)
+    n_files: int = 0
+    for filenames, _, _ in loader:
+        n_files += len(filenames)
+    return n_files
+
+
+#%%
+# every fold builds its DataLoader inside a loky worker like _run_fold
+fold_n_files = Parallel(n_jobs=N_JOBS, backend="loky")(
+    delayed(load_fold)(curr_val_fold=curr_val_fold)
+    for curr_val_fold in range(N_JOBS))
+print(fold_n_files)
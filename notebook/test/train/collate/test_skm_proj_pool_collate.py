@@ -5,6 +5,7 @@ from typing import Dict, List, Sequence
 import audio_classifier.common.feature_engineering.pool as feature_pool
 import audio_classifier.train.collate.base as base_collate
 import audio_classifier.train.collate.feature_engineering.skm as collate_skm
+import audio_classifier.train.collate.feature_engineering.skm_pool as collate_skm_pool
 import audio_classifier.train.collate.preprocessing.spectrogram.reshape as reshape_collate
 import audio_classifier.train.collate.preprocessing.spectrogram.transform as transform_collate
 import audio_classifier.train.data.dataset.base as dataset_base
@@ -91,3 +92,20 @@ for filenames, batch_projs, mel_freqs, mel_times, labels in loader:
               gt_data[filename] is not curr_projs)
 
 # %%
+fused_collate_func = base_collate.EnsembleCollateFunction(collate_funcs=[
+    partial(transform_collate.mel_spectrogram_collate, config=mel_config),
+    partial(reshape_collate.slice_flatten_collate, config=reshape_config),
+    partial(collate_skm_pool.skm_skl_proj_mean_std_pool_collate,
+            skms=skms,
+            pool_config=pool_config)
+])
+loader = DataLoader(dataset=dataset,
+                    batch_size=2,
+                    num_workers=3,
+                    collate_fn=fused_collate_func)
+for filenames, batch_projs, mel_freqs, mel_times, labels in loader:
+    for filename, curr_projs, mel_freq, mel_time, label in zip(
+            filenames, batch_projs, mel_freqs, mel_times, labels):
+        print(np.allclose(gt_data[filename], curr_projs))
+
+# %%
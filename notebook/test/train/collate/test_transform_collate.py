@@ -62,9 +62,12 @@ for filenames, mel_specs, mel_freqs, mel_times, labels in loader:
             hop_size=config.hop_size,
             apply_log=config.apply_log)
         is_pass: bool = True
-        is_pass = is_pass and np.array_equal(mel_spec, mel_spec_pr)
+        is_pass = is_pass and np.allclose(mel_spec,
+                                          mel_spec_pr,
+                                          rtol=1e-4,
+                                          atol=1e-4)
         is_pass = is_pass and np.array_equal(mel_freq, mel_freq_pr)
-        is_pass = is_pass and np.array_equal(mel_time, mel_time_pr)
+        is_pass = is_pass and np.allclose(mel_time, mel_time_pr)
         print(str.format("{} {}", filename, is_pass))
 
 # %%
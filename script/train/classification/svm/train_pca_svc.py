@@ -2,16 +2,22 @@ import os
 import sys
 from argparse import Namespace
 from functools import partial
-from typing import List, Sequence
+from typing import List, Sequence, Tuple
 
-import audio_classifier.common.feature_engineering.pool as feature_pool
+import audio_classifier.common.feature_engineering.skm_proj as feature_skm_proj
+import audio_classifier.config.feature_engineering.pool as conf_pool
+import audio_classifier.config.preprocessing.reshape as conf_reshape
+import audio_classifier.config.preprocessing.spec as conf_spec
 import audio_classifier.train.collate.base as collate_base
-import audio_classifier.train.collate.feature_engineering.pool as collate_pool
-import audio_classifier.train.collate.feature_engineering.skm as collate_skm
+import audio_classifier.train.collate.feature_engineering.skm_pool as collate_skm_pool
 import audio_classifier.train.collate.preprocessing.spectrogram.reshape as collate_reshape
 import audio_classifier.train.collate.preprocessing.spectrogram.transform as collate_transform
+import audio_classifier.train.config.alg as conf_alg
+import audio_classifier.train.config.dataset as conf_dataset
+import audio_classifier.train.config.loader as conf_loader
 import script.train.skl_loader.skm as skl_skm_laoder
 from audio_classifier.train.data.dataset.composite import KFoldDatasetGenerator
+from joblib import Parallel, delayed
 from script.train import train_common
 from script.train.classification import classify_common
 from script.train.classification.svm import train_pca_svc
@@ -36,40 +42,80 @@ def main(args: List[str]):
         metadata=metadata,
         dataset_config=dataset_config,
         mel_spec_config=mel_spec_config)
-    for curr_val_fold in range(dataset_config.k_folds):
-        curr_val_skm_path_stub: str = skl_skm_laoder.get_curr_val_skm_path_stub(
-            curr_val_fold=curr_val_fold,
-            skm_root_path=skm_root_path,
-            val_fold_path_stub=val_fold_path_stub,
-            class_skm_path_stub=class_skm_path_stub)
-        skms: Sequence[SphericalKMeans] = skl_skm_laoder.load_skl_skms(
-            curr_val_skm_path_stub=curr_val_skm_path_stub,
-            n_classes=dataset_config.n_classes)
-        collate_func: CollateFuncType = collate_base.EnsembleCollateFunction(
-            collate_funcs=[
-                partial(collate_transform.mel_spectrogram_collate,
-                        config=mel_spec_config),
-                partial(collate_reshape.slice_flatten_collate,
-                        config=reshape_config),
-                partial(collate_skm.skm_skl_proj_collate, skms=skms),
-                partial(collate_pool.pool_collate,
-                        pool_func=feature_pool.MeanStdPool(),
-                        pool_config=pool_config)
-            ])
-        train, val = classify_common.generate_proj_dataset(
-            curr_val_fold=curr_val_fold,
-            dataset_generator=dataset_generator,
-            collate_function=collate_func,
-            loader_config=loader_config)
-        pca_svc: Pipeline = train_pca_svc.train_pca_svc(
-            curr_val_fold=curr_val_fold,
-            dataset=train,
-            pca_config=pca_config,
-            svc_config=svc_config,
-            export_path=export_path)
-        classify_common.report_slices_acc(classifier=pca_svc,
-                                          train=train,
-                                          val=val)
+    n_jobs: int = max(min(argv.n_jobs, dataset_config.k_folds), 1)
+    # every fold has its own skms, pca and svc, so the folds are independent
+    fold_jobs = (delayed(_run_fold)(curr_val_fold=curr_val_fold,
+                                    skm_root_path=skm_root_path,
+                                    val_fold_path_stub=val_fold_path_stub,
+                                    class_skm_path_stub=class_skm_path_stub,
+                                    export_path=export_path,
+                                    dataset_generator=dataset_generator,
+                                    dataset_config=dataset_config,
+                                    mel_spec_config=mel_spec_config,
+                                    reshape_config=reshape_config,
+                                    pool_config=pool_config,
+                                    pca_config=pca_config,
+                                    svc_config=svc_config,
+                                    loader_config=loader_config,
+                                    n_jobs=n_jobs)
+                 for curr_val_fold in range(dataset_config.k_folds))
+    fold_accs: Sequence[Tuple[float, float]] = Parallel(
+        n_jobs=n_jobs, backend="loky")(fold_jobs)
+    for train_acc, val_acc in fold_accs:
+        info_str: str = str.format("train: {:.5f} val: {:.5f}", train_acc,
+                                   val_acc)
+        print(info_str)
+
+
+def _run_fold(curr_val_fold: int, skm_root_path: str,
+              val_fold_path_stub: str, class_skm_path_stub: str,
+              export_path: str, dataset_generator: KFoldDatasetGenerator,
+              dataset_config: conf_dataset.PreSplitFoldDatasetConfig,
+              mel_spec_config: conf_spec.MelSpecConfig,
+              reshape_config: conf_reshape.ReshapeConfig,
+              pool_config: conf_pool.PoolConfig,
+              pca_config: conf_alg.PCAConfig, svc_config: conf_alg.SVCConfig,
+              loader_config: conf_loader.LoaderConfig,
+              n_jobs: int = 1) -> Tuple[float, float]:
+    if n_jobs > 1:
+        # share the loader workers among the parallel folds
+        loader_config = train_pca_svc.get_fold_loader_config(
+            loader_config=loader_config, n_jobs=n_jobs)
+    curr_val_skm_path_stub: str = skl_skm_laoder.get_curr_val_skm_path_stub(
+        curr_val_fold=curr_val_fold,
+        skm_root_path=skm_root_path,
+        val_fold_path_stub=val_fold_path_stub,
+        class_skm_path_stub=class_skm_path_stub)
+    skms: Sequence[SphericalKMeans] = skl_skm_laoder.load_skl_skms(
+        curr_val_skm_path_stub=curr_val_skm_path_stub,
+        n_classes=dataset_config.n_classes)
+    collate_func: CollateFuncType = collate_base.EnsembleCollateFunction(
+        collate_funcs=[
+            partial(collate_transform.mel_spectrogram_collate,
+                    config=mel_spec_config),
+            partial(collate_reshape.slice_flatten_collate,
+                    config=reshape_config),
+            partial(collate_skm_pool.skm_skl_proj_mean_std_pool_collate,
+                    skms=skms,
+                    pool_config=pool_config,
+                    skm_proj_func=feature_skm_proj.get_skl_skm_proj_func(
+                        skms=skms))
+        ])
+    train, val = classify_common.generate_proj_dataset(
+        curr_val_fold=curr_val_fold,
+        dataset_generator=dataset_generator,
+        collate_function=collate_func,
+        loader_config=loader_config)
+    pca_svc: Pipeline = train_pca_svc.train_pca_svc(
+        curr_val_fold=curr_val_fold,
+        dataset=train,
+        pca_config=pca_config,
+        svc_config=svc_config,
+        export_path=export_path)
+    return classify_common.report_slices_acc(classifier=pca_svc,
+                                             train=train,
+                                             val=val,
+                                             to_print=False)
 
 
 if __name__ == "__main__":
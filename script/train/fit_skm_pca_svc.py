@@ -4,6 +4,7 @@ import sys
 from argparse import ArgumentParser, Namespace
 from typing import List, Union
 
+import audio_classifier.common.feature_engineering.skm_proj as feature_skm_proj
 import audio_classifier.config.feature_engineering.pool as conf_pool
 import audio_classifier.config.preprocessing.reshape as conf_reshape
 import audio_classifier.config.preprocessing.spec as conf_spec
@@ -51,18 +52,23 @@ def main(args: List[str]):
                 skms=curr_skms,
                 classifier=classifier,
                 configs=configs)
+            # built once per fold so that both test audios share one verified projector
+            skm_proj_func = feature_skm_proj.get_skl_skm_proj_func(
+                skms=curr_skms, quantize=configs.skm_config.quantize)
             pos_bincount: np.ndarray = fit_skm_pca_svc.infer_single_audio(
                 file_path=configs.pos_test_audio_path,
                 skms=curr_skms,
                 classifier=classifier,
-                configs=configs)
+                configs=configs,
+                skm_proj_func=skm_proj_func)
             pos_recall: float = pos_bincount[0] / (pos_bincount[0] +
                                                    pos_bincount[1])
             neg_bincount: np.ndarray = fit_skm_pca_svc.infer_single_audio(
                 file_path=configs.neg_test_audio_path,
                 skms=curr_skms,
                 classifier=classifier,
-                configs=configs)
+                configs=configs,
+                skm_proj_func=skm_proj_func)
             neg_recall: float = neg_bincount[0] / (neg_bincount[0] +
                                                    neg_bincount[1])
             confusion_mat: np.ndarray = np.stack((pos_bincount, neg_bincount),
@@ -107,6 +113,11 @@ def get_argparse() -> ArgumentParser:
                         required=True,
                         help="the export path")
     parser.add_argument("--export_filename", type=str, default="metrics.pkl")
+    parser.add_argument(
+        "--cache_path",
+        type=str,
+        default=None,
+        help="directory used to cache the preprocessed spectrogram slices")
     return parser
 
 
@@ -4,6 +4,7 @@ import sys
 from argparse import ArgumentParser, Namespace
 from typing import List
 
+import audio_classifier.common.feature_engineering.skm_proj as feature_skm_proj
 import audio_classifier.config.feature_engineering.pool as conf_pool
 import audio_classifier.config.preprocessing.reshape as conf_reshape
 import audio_classifier.config.preprocessing.spec as conf_spec
@@ -39,6 +40,11 @@ def get_argparse() -> ArgumentParser:
                         required=True,
                         help="the export path")
     parser.add_argument("--export_filename", type=str, default="metrics.pkl")
+    parser.add_argument(
+        "--cache_path",
+        type=str,
+        default=None,
+        help="directory used to cache the preprocessed spectrogram slices")
     return parser
 
 
@@ -60,6 +66,8 @@ def main(args: List[str]):
     for curr_fold in range(configs.dataset_config.k_folds):
         curr_dataset = ConcatDataset(datasets[0:curr_fold + 1])
         skms = bias_variance.fit_skms(curr_dataset, configs)
+        skm_proj_func = feature_skm_proj.get_skl_skm_proj_func(
+            skms=skms, quantize=configs.skm_config.quantize)
         classifier, train_acc = bias_variance.train_classifier(
             dataset=curr_dataset, skms=skms, configs=configs)
         val_acc: float = bias_variance.val_classifier(dataset=val_dataset,
@@ -67,7 +75,10 @@ def main(args: List[str]):
                                                       classifier=classifier,
                                                       configs=configs)
         test_acc: float = bias_variance.infer_single_audio(
-            skms=skms, classifier=classifier, configs=configs)
+            skms=skms,
+            classifier=classifier,
+            configs=configs,
+            skm_proj_func=skm_proj_func)
         print(
             str.format("n_folds {}: train {} val {} test {}", curr_fold + 1,
                        train_acc, val_acc, test_acc))
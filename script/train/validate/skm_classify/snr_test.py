@@ -6,6 +6,7 @@ from functools import partial
 from typing import List, Sequence, Tuple, Union
 
 import audio_classifier.common.feature_engineering.pool as feature_pool
+import audio_classifier.common.feature_engineering.skm_proj as feature_skm_proj
 import audio_classifier.train.collate.augment.sound_wave as collate_augment_sound_wave
 import audio_classifier.train.collate.base as collate_base
 import audio_classifier.train.collate.feature_engineering.pool as collate_pool
@@ -58,6 +59,7 @@ def main(args: List[str]):
         skms: Sequence[SphericalKMeans] = skl_skm_laoder.load_skl_skms(
             curr_val_skm_path_stub=curr_val_skm_path_stub,
             n_classes=dataset_config.n_classes)
+        skm_proj_func = feature_skm_proj.get_skl_skm_proj_func(skms=skms)
         classifier_path: str = str.format(classifier_path_stub, curr_val_fold)
         classifier: Union[ClassifierMixin,
                           Pipeline] = skl_classifier_loader.load_classifier(
@@ -84,7 +86,9 @@ def main(args: List[str]):
                             config=mel_spec_config),
                     partial(collate_reshape.slice_flatten_collate,
                             config=reshape_config),
-                    partial(collate_skm.skm_skl_proj_collate, skms=skms),
+                    partial(collate_skm.skm_skl_proj_collate,
+                            skms=skms,
+                            skm_proj_func=skm_proj_func),
                     partial(collate_pool.pool_collate,
                             pool_func=feature_pool.MeanStdPool(),
                             pool_config=pool_config)
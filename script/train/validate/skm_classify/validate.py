@@ -6,6 +6,7 @@ from functools import partial
 from typing import List, Sequence, Tuple, Union
 
 import audio_classifier.common.feature_engineering.pool as feature_pool
+import audio_classifier.common.feature_engineering.skm_proj as feature_skm_proj
 import audio_classifier.train.collate.base as collate_base
 import audio_classifier.train.collate.feature_engineering.pool as collate_pool
 import audio_classifier.train.collate.feature_engineering.skm as collate_skm
@@ -65,7 +66,10 @@ def main(args: List[str]):
                         config=mel_spec_config),
                 partial(collate_reshape.slice_flatten_collate,
                         config=reshape_config),
-                partial(collate_skm.skm_skl_proj_collate, skms=skms),
+                partial(collate_skm.skm_skl_proj_collate,
+                        skms=skms,
+                        skm_proj_func=feature_skm_proj.get_skl_skm_proj_func(
+                            skms=skms)),
                 partial(collate_pool.pool_collate,
                         pool_func=feature_pool.MeanStdPool(),
                         pool_config=pool_config)
@@ -3,6 +3,7 @@ from functools import partial
 from typing import Callable, MutableSequence, Sequence, Tuple
 
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 
 
 class PoolFunc:
@@ -75,3 +76,38 @@ def apply_pool_func(
         pool_projs.append(curr_pool_proj)
     pool_projs = list(pool_projs)
     return pool_projs
+
+
+def apply_mean_std_pool(spec_projs: np.ndarray,
+                        pool_size: int = -1,
+                        stride_size: int = -1) -> np.ndarray:
+    """Apply `MeanStdPool` on all the sliding windows of a file at once.
+
+    Equivalent to `apply_pool_func(spec_projs, MeanStdPool(), pool_size, stride_size)`, but all the windows are reduced in one vectorized pass and stacked into a single array.
+
+    Args:
+        spec_projs (np.ndarray): (n_slices, n_clusters) The input projection vector of an audio.
+        pool_size (int, optional): The size of the sliding window. Defaults to -1 set the pool_size to len(projections).
+        stride_size (int, optional): The stride of the sliding window. Defaults to -1 set the stride_size to pool_size.
+
+    Returns:
+        pool_projs (np.ndarray): (n_slices_prime, 2 * n_clusters) The mean and std of each window. (n_slices_prime, n_clusters) with only the mean when the window holds a single slice.
+    """
+    if pool_size == -1:
+        pool_size = len(spec_projs)
+    if stride_size == -1:
+        stride_size = pool_size
+    if len(spec_projs) < pool_size or pool_size == 0:
+        # keep the width of the pooled features regardless of the input length
+        n_output_features: int = spec_projs.shape[-1] * (1 if pool_size == 1
+                                                         else 2)
+        return np.empty((0, n_output_features), dtype=spec_projs.dtype)
+    # (n_slices_prime, n_clusters, pool_size)
+    windows: np.ndarray = sliding_window_view(spec_projs, pool_size,
+                                              axis=0)[::stride_size]
+    pool_means: np.ndarray = np.mean(windows, axis=-1)
+    if pool_size == 1:
+        return pool_means
+    pool_stds: np.ndarray = np.std(windows, axis=-1)
+    pool_projs: np.ndarray = np.concatenate((pool_means, pool_stds), axis=1)
+    return pool_projs
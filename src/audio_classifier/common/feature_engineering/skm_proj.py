@@ -1,9 +1,15 @@
-from typing import List, Sequence
+import warnings
+from typing import Callable, List, Optional, Sequence, Tuple
 
 import numpy as np
 from onnxruntime.capi.onnxruntime_inference_collection import InferenceSession
 from sklearn_plugins.cluster.spherical_kmeans import SphericalKMeans
 
+try:
+    import torch
+except ImportError:
+    torch = None
+
 
 def proj_skl_skm(spec_flat_slices: Sequence[np.ndarray],
                  skms: Sequence[SphericalKMeans]) -> np.ndarray:
@@ -47,3 +53,417 @@ def proj_onnx_skm(spec_flat_slices: Sequence[np.ndarray],
         return spec_projs_list[0]
     spec_projs: np.ndarray = np.concatenate(tuple(spec_projs_list), axis=1)
     return spec_projs
+
+
+def quantize_rows(mat: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetrically quantize each row of a matrix to int8.
+
+    Args:
+        mat (np.ndarray): (n_rows, n_cols) The matrix to be quantized.
+
+    Returns:
+        mat_i8 (np.ndarray): (n_rows, n_cols) The quantized matrix.
+        scales (np.ndarray): (n_rows, ) The scale of each row such that `mat ~= mat_i8 * scales[:, None]`.
+    """
+    scales: np.ndarray = np.max(np.abs(mat), axis=1).astype(np.float32) / 127
+    scales[scales == 0] = 1
+    mat_i8: np.ndarray = np.rint(mat / scales[:, None]).astype(np.int8)
+    return mat_i8, scales
+
+
+def matmul_int8(x_i8: np.ndarray, x_scales: np.ndarray, w_i8: np.ndarray,
+                w_scales: np.ndarray) -> np.ndarray:
+    """Compute the dequantized product of two row-quantized matrices.
+
+    Uses `torch._int_mm` when available, otherwise falls back to a fp32 matmul of the quantized values.
+
+    Args:
+        x_i8 (np.ndarray): (n_rows, n_features) The quantized input.
+        x_scales (np.ndarray): (n_rows, ) The scale of each input row.
+        w_i8 (np.ndarray): (n_outputs, n_features) The quantized weights.
+        w_scales (np.ndarray): (n_outputs, ) The scale of each weight row.
+
+    Returns:
+        prod (np.ndarray): (n_rows, n_outputs) The approximation of `x @ w.T` in float32.
+    """
+    prod: np.ndarray
+    try:
+        prod = torch._int_mm(torch.from_numpy(x_i8),
+                             torch.from_numpy(w_i8).T.contiguous()).numpy()
+    except (AttributeError, RuntimeError):
+        prod = np.matmul(x_i8.astype(np.float32), w_i8.T.astype(np.float32))
+    prod = prod.astype(np.float32, copy=False)
+    prod *= x_scales[:, None]
+    prod *= w_scales[None, :]
+    return prod
+
+
+class FusedSKMProj:
+    """Project flat slices to the centroids of all fitted spherical k-means with a single matmul.
+
+    Each skm maps a slice into its centroid space with standardization, an optional row normalization and pca (whitened or not), normalizes the result to unit length and takes the dot product with the centroids.
+    Standardization and pca are affine, and the row normalization only scales the standardized slice before the pca mean is subtracted, so each feature is `(slices @ weight.T + pre_bias) / input_norm + post_bias`.
+    The weights and their products with the centroids of every skm are stacked into one weight matrix, so a single GEMM yields the unnormalized projections as well as the features needed for the normalization.
+    The first call checks the result against `SphericalKMeans.transform`. If they disagree, every call falls back to `proj_skl_skm`.
+
+    Attributes:
+        skms (Sequence[SphericalKMeans]): All the spherical k-means.
+        atol (float): The absolute tolerance used to check the reconstruction.
+    """
+    skms: Sequence[SphericalKMeans]
+    atol: float
+    _centroids: List[np.ndarray]
+    # (n_total_centroids + n_total_components, n_features)
+    _weights: np.ndarray
+    # (n_total_centroids + n_total_components, )
+    _pre_biases: np.ndarray
+    # (n_total_centroids + n_total_components, )
+    _post_biases: np.ndarray
+    # (n_total_centroids + n_total_components, ) index of the skm owning each output
+    _output_skms: np.ndarray
+    # (n_skms, ) the standardization (mean, inverse scale) of each skm normalizing its input, None otherwise
+    _input_scalers: List[Optional[Tuple[np.ndarray, np.ndarray]]]
+    _n_total_centroids: int
+    _n_centroids: np.ndarray
+    _component_splits: np.ndarray
+    _verified: Optional[bool]
+
+    def __init__(self, skms: Sequence[SphericalKMeans], atol: float = 1e-3):
+        self.skms = skms
+        self.atol = atol
+        self._centroids = [
+            np.asarray(skm.cluster_centers_, dtype=np.float64) for skm in skms
+        ]
+        feature_maps: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = [
+            _get_skm_feature_map(skm) for skm in skms
+        ]
+        self._weights = np.concatenate(
+            [
+                centroids @ weight for centroids, (weight, _, _) in zip(
+                    self._centroids, feature_maps)
+            ] + [weight for weight, _, _ in feature_maps],
+            axis=0).astype(np.float32)
+        self._pre_biases = np.concatenate(
+            [
+                centroids @ pre_bias for centroids, (_, pre_bias, _) in zip(
+                    self._centroids, feature_maps)
+            ] + [pre_bias for _, pre_bias, _ in feature_maps],
+            axis=0).astype(np.float32)
+        self._post_biases = np.concatenate(
+            [
+                centroids @ post_bias for centroids, (_, _, post_bias) in zip(
+                    self._centroids, feature_maps)
+            ] + [post_bias for _, _, post_bias in feature_maps],
+            axis=0).astype(np.float32)
+        self._n_centroids = np.asarray(
+            [len(centroids) for centroids in self._centroids], dtype=np.int64)
+        n_components: np.ndarray = np.asarray(
+            [len(weight) for weight, _, _ in feature_maps], dtype=np.int64)
+        self._n_total_centroids = int(np.sum(self._n_centroids))
+        self._component_splits = np.cumsum(n_components)[:-1]
+        skm_indices: np.ndarray = np.arange(len(skms))
+        self._output_skms = np.concatenate([
+            np.repeat(skm_indices, self._n_centroids),
+            np.repeat(skm_indices, n_components)
+        ])
+        self._input_scalers = [_get_skm_input_scaler(skm) for skm in skms]
+        self._verified = None
+
+    def __call__(self, spec_flat_slices: Sequence[np.ndarray]) -> np.ndarray:
+        """Project the flat slices of an audio to trained cluster centroids.
+
+        Args:
+            spec_flat_slices (Sequence[np.ndarray]): (n_slices, n_mels * slice_size) The flat slices of a spectrogram.
+
+        Returns:
+            spec_projs (np.ndarray): (n_slices, n_total_centroids) The projected slices.
+        """
+        if self._verified is False:
+            return proj_skl_skm(spec_flat_slices, self.skms)
+        slices: np.ndarray = np.asarray(spec_flat_slices, dtype=np.float32)
+        if self._verified is None:
+            spec_projs_ref: np.ndarray = proj_skl_skm(spec_flat_slices,
+                                                      self.skms)
+            self._verified = self._verify(slices, spec_projs_ref)
+            if self._verified is False:
+                return spec_projs_ref
+        return self._project(slices)
+
+    def _verify(self, slices: np.ndarray, spec_projs_ref: np.ndarray) -> bool:
+        """Check the fused projection against the reference projection.
+
+        Args:
+            slices (np.ndarray): (n_slices, n_mels * slice_size) The flat slices.
+            spec_projs_ref (np.ndarray): (n_slices, n_total_centroids) The projection of `SphericalKMeans.transform`.
+
+        Returns:
+            verified (bool): Whether the fused projection can replace `SphericalKMeans.transform`.
+        """
+        verified: bool = bool(
+            np.allclose(self._project_fused(slices),
+                        spec_projs_ref,
+                        atol=self.atol))
+        if verified is False:
+            warnings.warn(
+                "skm preprocessing can not be reconstructed, fall back to SphericalKMeans.transform"
+            )
+        return verified
+
+    def _project(self, slices: np.ndarray) -> np.ndarray:
+        return self._project_fused(slices)
+
+    def _project_fused(self, slices: np.ndarray) -> np.ndarray:
+        outputs: np.ndarray = self._apply_feature_maps(
+            slices, slice(None, None))
+        spec_projs: np.ndarray = outputs[:, :self._n_total_centroids]
+        norms: np.ndarray = self._get_norms(
+            outputs[:, self._n_total_centroids:])
+        # every centroid of a skm shares the norm of that skm's features
+        spec_projs /= np.repeat(norms, self._n_centroids, axis=1)
+        return spec_projs
+
+    def _apply_feature_maps(self, slices: np.ndarray,
+                            rows: slice) -> np.ndarray:
+        """Apply the stacked affine maps selected by `rows`, including the input normalization.
+
+        Args:
+            slices (np.ndarray): (n_slices, n_mels * slice_size) The flat slices.
+            rows (slice): The rows of the stacked weights to be applied.
+
+        Returns:
+            outputs (np.ndarray): (n_slices, n_rows) The unnormalized outputs.
+        """
+        outputs: np.ndarray = slices @ self._weights[rows].T
+        outputs += self._pre_biases[rows]
+        input_norms: Optional[np.ndarray] = self._get_input_norms(slices)
+        if input_norms is not None:
+            outputs /= input_norms[:, self._output_skms[rows]]
+        outputs += self._post_biases[rows]
+        return outputs
+
+    def _get_input_norms(self, slices: np.ndarray) -> Optional[np.ndarray]:
+        """Get the norm of the standardized slices for every skm normalizing its input.
+
+        Args:
+            slices (np.ndarray): (n_slices, n_mels * slice_size) The flat slices.
+
+        Returns:
+            input_norms (Optional[np.ndarray]): (n_slices, n_skms) The norm of the standardized slices, 1 for the skms not normalizing their input. None if no skm normalizes its input.
+        """
+        if all(input_scaler is None for input_scaler in self._input_scalers):
+            return None
+        input_norms: np.ndarray = np.ones((len(slices), len(self.skms)),
+                                          dtype=np.float32)
+        for i, input_scaler in enumerate(self._input_scalers):
+            if input_scaler is None:
+                continue
+            mean, inv_scale = input_scaler
+            input_norms[:, i] = np.linalg.norm((slices - mean) * inv_scale,
+                                               axis=1)
+        input_norms[input_norms == 0] = 1
+        return input_norms
+
+    def _get_features(self, slices: np.ndarray) -> List[np.ndarray]:
+        """Map flat slices into the centroid space of every skm.
+
+        Args:
+            slices (np.ndarray): (n_slices, n_mels * slice_size) The flat slices.
+
+        Returns:
+            features_list (List[np.ndarray]): (n_skms, n_slices, n_components) The unit length slices in the centroid space of each skm.
+        """
+        features: np.ndarray = self._apply_feature_maps(
+            slices, slice(self._n_total_centroids, None))
+        norms: np.ndarray = self._get_norms(features)
+        features_list: List[np.ndarray] = np.split(features,
+                                                   self._component_splits,
+                                                   axis=1)
+        return [
+            curr_features / norms[:, i:i + 1]
+            for i, curr_features in enumerate(features_list)
+        ]
+
+    def _get_norms(self, features: np.ndarray) -> np.ndarray:
+        """Get the norm of the features of each skm.
+
+        Args:
+            features (np.ndarray): (n_slices, n_components) The features of one or more skms side by side.
+
+        Returns:
+            norms (np.ndarray): (n_slices, n_skms) The norm of each slice in the centroid space of each skm.
+        """
+        features_list: List[np.ndarray] = np.split(features,
+                                                   self._component_splits,
+                                                   axis=1)
+        norms: np.ndarray = np.stack([
+            np.linalg.norm(curr_features, axis=1)
+            for curr_features in features_list
+        ],
+                                     axis=1)
+        norms[norms == 0] = 1
+        return norms
+
+
+class QuantizedSKMProj(FusedSKMProj):
+    """Project flat slices to the centroids of fitted spherical k-means with an int8 matmul.
+
+    The features in the centroid space of every skm are computed in fp32 as in `FusedSKMProj`, then the features and the centroids are quantized to int8 with per-row scales.
+    The first call also checks the int8 projection against `SphericalKMeans.transform`. If it is off by more than `int8_atol`, every call uses the fp32 fused projection instead.
+
+    Attributes:
+        int8_atol (float): The absolute tolerance used to check the int8 projection.
+    """
+    int8_atol: float
+    _centroids_i8: List[np.ndarray]
+    _centroid_scales: List[np.ndarray]
+    _use_int8: bool
+
+    def __init__(self,
+                 skms: Sequence[SphericalKMeans],
+                 atol: float = 1e-3,
+                 int8_atol: float = 2e-2):
+        super().__init__(skms=skms, atol=atol)
+        self.int8_atol = int8_atol
+        self._centroids_i8 = list()
+        self._centroid_scales = list()
+        for centroids in self._centroids:
+            centroids_i8, centroid_scales = quantize_rows(
+                centroids.astype(np.float32))
+            self._centroids_i8.append(centroids_i8)
+            self._centroid_scales.append(centroid_scales)
+        self._use_int8 = True
+
+    def _verify(self, slices: np.ndarray, spec_projs_ref: np.ndarray) -> bool:
+        if super()._verify(slices, spec_projs_ref) is False:
+            warnings.warn(
+                "int8 skm projection can not be used, quantize is ignored")
+            return False
+        self._use_int8 = bool(
+            np.allclose(self._project_int8(slices),
+                        spec_projs_ref,
+                        atol=self.int8_atol))
+        if self._use_int8 is False:
+            warnings.warn(
+                str.format(
+                    "int8 skm projection deviates by more than {}, fall back to fp32",
+                    self.int8_atol))
+        return True
+
+    def _project(self, slices: np.ndarray) -> np.ndarray:
+        if self._use_int8 is False:
+            return self._project_fused(slices)
+        return self._project_int8(slices)
+
+    def _project_int8(self, slices: np.ndarray) -> np.ndarray:
+        spec_projs_list: List[np.ndarray] = list()
+        for features, centroids_i8, centroid_scales in zip(
+                self._get_features(slices), self._centroids_i8,
+                self._centroid_scales):
+            features_i8, feature_scales = quantize_rows(features)
+            spec_projs_list.append(
+                matmul_int8(features_i8, feature_scales, centroids_i8,
+                            centroid_scales))
+        if len(spec_projs_list) == 1:
+            return spec_projs_list[0]
+        spec_projs: np.ndarray = np.concatenate(tuple(spec_projs_list), axis=1)
+        return spec_projs
+
+
+def get_skl_skm_proj_func(
+        skms: Sequence[SphericalKMeans],
+        quantize: bool = False
+) -> Callable[[Sequence[np.ndarray]], np.ndarray]:
+    """Get the function projecting flat slices to the centroids of `skms`.
+
+    Args:
+        skms (Sequence[SphericalKMeans]): All the spherical k-means.
+        quantize (bool, optional): Use the int8 `QuantizedSKMProj` instead of the fp32 `FusedSKMProj`. Defaults to False.
+
+    Returns:
+        skm_proj_func (Callable[[Sequence[np.ndarray]], np.ndarray]): The projection function.
+    """
+    if quantize is True:
+        return QuantizedSKMProj(skms=skms)
+    return FusedSKMProj(skms=skms)
+
+
+def _get_skm_std_scalar(
+    skm: SphericalKMeans
+) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+    """Get the mean and scale the standardization of an skm applies.
+
+    Args:
+        skm (SphericalKMeans): A trained SphericalKMeans instance.
+
+    Returns:
+        mean (Optional[np.ndarray]): (n_features, ) The subtracted mean, None if not centered.
+        scale (Optional[np.ndarray]): (n_features, ) The divided scale, None if not scaled.
+    """
+    std_scalar = getattr(skm, "std_scalar_", None)
+    if std_scalar is None:
+        return None, None
+    mean: Optional[np.ndarray] = None
+    scale: Optional[np.ndarray] = None
+    if getattr(std_scalar, "with_mean", True) is True:
+        mean = getattr(std_scalar, "mean_", None)
+    if getattr(std_scalar, "with_std", True) is True:
+        scale = getattr(std_scalar, "scale_", None)
+    return mean, scale
+
+
+def _get_skm_input_scaler(
+        skm: SphericalKMeans) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """Get the standardization of an skm normalizing its standardized input.
+
+    Args:
+        skm (SphericalKMeans): A trained SphericalKMeans instance.
+
+    Returns:
+        input_scaler (Optional[Tuple[np.ndarray, np.ndarray]]): (mean, inverse scale) such that the normalized vector is `(slices - mean) * inverse scale`. None if the skm does not normalize its input.
+    """
+    if getattr(skm, "normalize", False) is not True:
+        return None
+    mean, scale = _get_skm_std_scalar(skm)
+    n_features: int = np.shape(skm.cluster_centers_)[1]
+    pca = getattr(skm, "pca_", None)
+    if pca is not None:
+        n_features = np.shape(pca.components_)[1]
+    if mean is None:
+        mean = np.zeros(n_features)
+    inv_scale: np.ndarray = np.ones(
+        n_features) if scale is None else 1.0 / np.asarray(scale)
+    return np.asarray(mean, dtype=np.float32), inv_scale.astype(np.float32)
+
+
+def _get_skm_feature_map(
+        skm: SphericalKMeans) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Fold the standardization and pca of an skm into a single affine map.
+
+    The skm normalizes the standardized slices before the pca when `skm.normalize` is set, so the pca mean is kept in a separate bias applied after the normalization.
+
+    Args:
+        skm (SphericalKMeans): A trained SphericalKMeans instance.
+
+    Returns:
+        weight (np.ndarray): (n_components, n_features)
+        pre_bias (np.ndarray): (n_components, ) The bias applied before the input normalization.
+        post_bias (np.ndarray): (n_components, ) The bias applied after the input normalization. The map is `features = (slices @ weight.T + pre_bias) / input_norm + post_bias`.
+    """
+    mean, scale = _get_skm_std_scalar(skm)
+    pca = getattr(skm, "pca_", None)
+    weight: np.ndarray
+    post_bias: np.ndarray
+    if pca is not None:
+        weight = np.asarray(pca.components_, dtype=np.float64)
+        if pca.whiten:
+            weight = weight / np.sqrt(pca.explained_variance_)[:, None]
+        post_bias = -(weight @ np.asarray(pca.mean_, dtype=np.float64))
+    else:
+        weight = np.eye(np.shape(skm.cluster_centers_)[1])
+        post_bias = np.zeros(len(weight))
+    if scale is not None:
+        weight = weight / np.asarray(scale, dtype=np.float64)[None, :]
+    pre_bias: np.ndarray = np.zeros(len(weight))
+    if mean is not None:
+        pre_bias = -(weight @ np.asarray(mean, dtype=np.float64))
+    return weight, pre_bias, post_bias
@@ -1,6 +1,7 @@
 from collections import deque
 from typing import Deque, Sequence
 import numpy as np
+from numpy.lib.stride_tricks import as_strided
 
 
 def slice_spectrogram(spectrogram: np.ndarray,
@@ -47,6 +48,38 @@ def flatten_slice(slice: np.ndarray, copy: bool = False) -> np.ndarray:
     return flat_slice
 
 
+def slice_flatten_spectrogram(spectrogram: np.ndarray,
+                              slice_size: int,
+                              stride_size: int,
+                              copy: bool = False) -> np.ndarray:
+    """Slice a spectrogram and flatten every slice at once.
+
+    Equivalent to calling `flatten_slice` on every slice returned by `slice_spectrogram`, but the flat slices are rows of a single array.
+
+    Args:
+        spectrogram (np.ndarray): (n_sample_freq, n_sample_time) Raw spectrogram to be slice.
+        slice_size (int): Number of time bins for each sliced spectrogram
+        stride_size (int): Number of time bins to skip while slicing.
+        copy (bool): If `True`, then the returned `flat_slices` owns its data. Otherwise it is a read-only strided view of a time-major copy of `spectrogram` (or of `spectrogram` itself when `spectrogram.T` is contiguous). Defaults to `False`.
+
+    Returns:
+        flat_slices (np.ndarray): (n_slices, n_sample_freq * slice_size) The flattened slices in the order of `flatten_slice`.
+    """
+    n_sample_freq: int = spectrogram.shape[0]
+    n_slices: int = max((spectrogram.shape[1] - slice_size) // stride_size + 1,
+                        0)
+    # each flat slice is a contiguous run of time frames in (n_sample_time, n_sample_freq)
+    frames: np.ndarray = np.ascontiguousarray(spectrogram.T)
+    flat_slices: np.ndarray = as_strided(
+        frames,
+        shape=(n_slices, n_sample_freq * slice_size),
+        strides=(stride_size * frames.strides[0], frames.strides[1]),
+        writeable=False)
+    if copy == True:
+        return np.copy(flat_slices)
+    return flat_slices
+
+
 def unflatten_slice(flat_slice: np.ndarray,
                     slice_size: int,
                     copy: bool = False):
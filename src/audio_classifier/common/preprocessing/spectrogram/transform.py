@@ -1,8 +1,104 @@
-from typing import Tuple
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
 
 import librosa.core as rosa_core
-import librosa.feature as rosa_feature
+import librosa.filters as rosa_filters
+import librosa.util as rosa_util
 import numpy as np
+import scipy.fft as sp_fft
+from numba import njit
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+@lru_cache(maxsize=8)
+def get_stft_window(window_size: int) -> np.ndarray:
+    """Get the hann window applied to each stft frame.
+
+    The result is cached and read-only.
+
+    Args:
+        window_size (int): Length of the hann window.
+
+    Returns:
+        window (np.ndarray): (window_size, ) The hann window.
+    """
+    window: np.ndarray = rosa_filters.get_window("hann",
+                                                 window_size,
+                                                 fftbins=True)
+    window = np.ascontiguousarray(window, dtype=np.float32)
+    window.flags.writeable = False
+    return window
+
+
+@lru_cache(maxsize=8)
+def get_mel_filter_bank(sample_rate: int, n_fft: int, n_mels: int,
+                        freq_min: float, freq_max: float,
+                        window_size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Get the mel filter bank and the stft window for a spectrogram configuration.
+
+    The result is cached so that the same arrays are shared by every call with the same configuration. Both arrays are read-only.
+
+    Args:
+        sample_rate (int): Sample rate of the sound wave.
+        n_fft (int): Number of FFT components.
+        n_mels (int): Number of Mel bands to generate.
+        freq_min (float): Lowest frequency (in Hz)
+        freq_max (float): Highest frequency (in Hz).
+        window_size (int): Length of the hann window applied to each frame.
+
+    Returns:
+        mel_basis (np.ndarray): (n_mels, 1 + n_fft/2) The mel filter bank.
+        window (np.ndarray): (window_size, ) The hann window.
+    """
+    mel_basis: np.ndarray = rosa_filters.mel(sr=sample_rate,
+                                             n_fft=n_fft,
+                                             n_mels=n_mels,
+                                             fmin=freq_min,
+                                             fmax=freq_max)
+    mel_basis = np.ascontiguousarray(mel_basis, dtype=np.float32)
+    mel_basis.flags.writeable = False
+    window: np.ndarray = get_stft_window(window_size=window_size)
+    return mel_basis, window
+
+
+@lru_cache(maxsize=8)
+def get_fft_frequencies(sample_rate: int, n_fft: int) -> np.ndarray:
+    """Get the frequencies of each stft bin.
+
+    The result is cached and read-only so it can be shared by every spectrogram with the same configuration.
+
+    Args:
+        sample_rate (int): Sample rate of the sound wave.
+        n_fft (int): Number of FFT components.
+
+    Returns:
+        stft_freq (np.ndarray): (1 + n_fft/2, ) Frequencies corresponding to each stft bin.
+    """
+    stft_freq: np.ndarray = np.fft.rfftfreq(n=n_fft, d=1.0 / sample_rate)
+    stft_freq.flags.writeable = False
+    return stft_freq
+
+
+@lru_cache(maxsize=8)
+def get_mel_frequencies(n_mels: int, freq_min: float,
+                        freq_max: float) -> np.ndarray:
+    """Get the center frequencies of each mel band.
+
+    The result is cached and read-only so it can be shared by every spectrogram with the same configuration.
+
+    Args:
+        n_mels (int): Number of Mel bands.
+        freq_min (float): Lowest frequency (in Hz)
+        freq_max (float): Highest frequency (in Hz).
+
+    Returns:
+        mel_freq (np.ndarray): (n_mels, ) Frequencies corresponding to each mel band.
+    """
+    mel_freq: np.ndarray = rosa_core.mel_frequencies(n_mels=n_mels,
+                                                     fmin=freq_min,
+                                                     fmax=freq_max)
+    mel_freq.flags.writeable = False
+    return mel_freq
 
 
 def transform_stft_spectrogram(
@@ -29,7 +125,7 @@ def transform_stft_spectrogram(
                                            win_length=window_size,
                                            hop_length=hop_size,
                                            center=False)
-    stft_spec = np.abs(stft_spec)
+    stft_spec = np.abs(stft_spec).astype(np.float32, copy=False)
     stft_freq: np.ndarray = rosa_core.fft_frequencies(sr=sample_rate,
                                                       n_fft=n_fft)
     stft_time: np.ndarray = rosa_core.times_like(X=stft_spec,
@@ -47,9 +143,18 @@ def transform_stft_spectrogram(
 
 
 def transform_mel_spectrogram(
-        sound_wave: np.ndarray, sample_rate: int, n_fft: int, n_mels: int,
-        freq_min: float, freq_max: float, window_size: int, hop_size: int,
-        apply_log: bool) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    sound_wave: np.ndarray,
+    sample_rate: int,
+    n_fft: int,
+    n_mels: int,
+    freq_min: float,
+    freq_max: float,
+    window_size: int,
+    hop_size: int,
+    apply_log: bool,
+    mel_basis: Optional[np.ndarray] = None,
+    window: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
     """Transform a sound wave to mel-spectrogram.
 
     Args:
@@ -62,26 +167,29 @@ def transform_mel_spectrogram(
         window_size (int): Each frame of audio is windowed by window of length `window_size` and then padded with zeros to match `n_fft`.
         hop_size (int): Number of audio samples between adjacent STFT columns.
         apply_log (bool): Wheather or not to apply log10 to the `mel_spec` before return.
+        mel_basis (Optional[np.ndarray], optional): (n_mels, 1 + n_fft/2) Precomputed mel filter bank. Defaults to None will be fetched from `get_mel_filter_bank`.
+        window (Optional[np.ndarray], optional): (window_size, ) Precomputed stft window. Defaults to None will be fetched from `get_mel_filter_bank`.
 
     Returns:
         mel_spec (np.ndarray): (n_mels, n_frames) The mel-spectrogram of the `sample_rate`.
         mel_freq (np.ndarray): (n_mels, ) Frequencies corresponding to each bin in `mel_spec`.
         mel_time (np.ndarray): (n_frames, ) Time stamps (in seconds) corresponding to each frame of `mel_spec`.
     """
+    if mel_basis is None or window is None:
+        mel_basis, window = get_mel_filter_bank(sample_rate=sample_rate,
+                                                n_fft=n_fft,
+                                                n_mels=n_mels,
+                                                freq_min=freq_min,
+                                                freq_max=freq_max,
+                                                window_size=window_size)
     stft_spec: np.ndarray = rosa_core.stft(y=sound_wave,
                                            n_fft=n_fft,
                                            win_length=window_size,
                                            hop_length=hop_size,
+                                           window=window,
                                            center=False)
-    stft_spec = np.abs(stft_spec)
-    mel_spec: np.ndarray = rosa_feature.melspectrogram(S=stft_spec**2,
-                                                       sr=sample_rate,
-                                                       n_mels=n_mels,
-                                                       n_fft=n_fft,
-                                                       hop_length=hop_size,
-                                                       win_length=window_size,
-                                                       fmin=freq_min,
-                                                       fmax=freq_max)
+    stft_spec = np.abs(stft_spec).astype(np.float32, copy=False)
+    mel_spec: np.ndarray = np.dot(mel_basis, stft_spec**2)
     mel_freq: np.ndarray = rosa_core.mel_frequencies(
         n_mels=n_mels,
         fmin=freq_min,
@@ -99,3 +207,264 @@ def transform_mel_spectrogram(
                                  posinf=0.0,
                                  neginf=0.0)
     return mel_spec, mel_freq, mel_time
+
+
+def pad_sound_waves(sound_waves: Sequence[np.ndarray],
+                    min_length: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Zero pad a batch of sound waves of different length into a single 2D array.
+
+    Args:
+        sound_waves (Sequence[np.ndarray]): (batch_size, n_samples) The sound waves to be padded.
+        min_length (int, optional): The minimum number of samples of the padded array. Defaults to 0.
+
+    Returns:
+        padded_waves (np.ndarray): (batch_size, max_n_samples) The zero padded sound waves.
+        lengths (np.ndarray): (batch_size, ) The original number of samples of each sound wave.
+    """
+    lengths: np.ndarray = np.asarray([len(w) for w in sound_waves],
+                                     dtype=np.int64)
+    max_length: int = max(int(lengths.max(initial=0)), min_length)
+    padded_waves: np.ndarray = np.zeros((len(sound_waves), max_length),
+                                        dtype=np.float32)
+    for i, sound_wave in enumerate(sound_waves):
+        padded_waves[i, :lengths[i]] = sound_wave
+    return padded_waves, lengths
+
+
+def _prepare_frames(
+        sound_waves: Sequence[np.ndarray], n_fft: int, hop_size: int,
+        window: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Pad a batch of sound waves and count the stft frames of each.
+
+    Frames are not centered, matching `librosa.stft(center=False)`.
+
+    Args:
+        sound_waves (Sequence[np.ndarray]): (batch_size, n_samples) The sound waves to be transformed.
+        n_fft (int): Number of FFT components.
+        hop_size (int): Number of audio samples between adjacent STFT columns.
+        window (np.ndarray): (window_size, ) The window applied to each frame.
+
+    Returns:
+        padded_waves (np.ndarray): (batch_size, max_n_samples) The zero padded sound waves.
+        n_frames (np.ndarray): (batch_size, ) The number of valid frames of each sound wave.
+        fft_window (np.ndarray): (n_fft, ) The `window` zero padded to `n_fft`.
+    """
+    padded_waves, lengths = pad_sound_waves(sound_waves=sound_waves,
+                                            min_length=n_fft)
+    n_frames: np.ndarray = np.maximum((lengths - n_fft) // hop_size + 1, 0)
+    fft_window: np.ndarray = rosa_util.pad_center(np.asarray(window),
+                                                  size=n_fft)
+    return padded_waves, n_frames, fft_window
+
+
+def _stft_batch(padded_waves: np.ndarray, n_fft: int, hop_size: int,
+                fft_window: np.ndarray) -> np.ndarray:
+    """Compute the stft of a batch of sound waves with a single fft call.
+
+    Args:
+        padded_waves (np.ndarray): (batch_size, max_n_samples) The zero padded sound waves.
+        n_fft (int): Number of FFT components.
+        hop_size (int): Number of audio samples between adjacent STFT columns.
+        fft_window (np.ndarray): (n_fft, ) The window applied to each frame.
+
+    Returns:
+        stft (np.ndarray): (batch_size, max_n_frames, 1 + n_fft/2) The complex stft.
+    """
+    frames: np.ndarray = sliding_window_view(padded_waves, n_fft,
+                                             axis=-1)[:, ::hop_size, :]
+    stft: np.ndarray = sp_fft.rfft(frames * fft_window, n=n_fft, axis=-1)
+    return stft
+
+
+@njit(cache=True, fastmath=True)
+def _stft_spectrogram_batch_nb(stft: np.ndarray,
+                               n_frames: np.ndarray) -> np.ndarray:
+    """Magnitude over the valid frames of a batch.
+
+    Returns:
+        stft_specs (np.ndarray): (batch_size, max_n_frames, 1 + n_fft/2) Frames beyond `n_frames` are left as zeros.
+    """
+    n_waves, max_n_frames, n_bins = stft.shape
+    stft_specs = np.zeros((n_waves, max_n_frames, n_bins), dtype=np.float32)
+    for i in range(n_waves):
+        for t in range(n_frames[i]):
+            for k in range(n_bins):
+                z = stft[i, t, k]
+                stft_specs[i, t, k] = np.sqrt(z.real * z.real +
+                                              z.imag * z.imag)
+    return stft_specs
+
+
+@njit(cache=True, fastmath=True)
+def _mel_spectrogram_batch_nb(stft: np.ndarray, n_frames: np.ndarray,
+                              mel_basis: np.ndarray) -> np.ndarray:
+    """Fused power and mel projection over the valid frames of a batch.
+
+    Each mel filter only covers a few fft bins, so the projection is restricted to the non-zero range of each filter.
+
+    Returns:
+        mel_specs (np.ndarray): (batch_size, max_n_frames, n_mels) Frames beyond `n_frames` are left as zeros.
+    """
+    n_waves, max_n_frames, n_bins = stft.shape
+    n_mels = mel_basis.shape[0]
+    band_begin = np.zeros(n_mels, dtype=np.int64)
+    band_end = np.zeros(n_mels, dtype=np.int64)
+    for m in range(n_mels):
+        begin = n_bins
+        end = 0
+        for k in range(n_bins):
+            if mel_basis[m, k] != 0.0:
+                begin = min(begin, k)
+                end = k + 1
+        band_begin[m] = begin
+        band_end[m] = end
+    mel_specs = np.zeros((n_waves, max_n_frames, n_mels), dtype=np.float32)
+    power = np.empty(n_bins, dtype=np.float32)
+    for i in range(n_waves):
+        for t in range(n_frames[i]):
+            for k in range(n_bins):
+                z = stft[i, t, k]
+                power[k] = z.real * z.real + z.imag * z.imag
+            for m in range(n_mels):
+                val = 0.0
+                for k in range(band_begin[m], band_end[m]):
+                    val += mel_basis[m, k] * power[k]
+                mel_specs[i, t, m] = val
+    return mel_specs
+
+
+def _apply_log(spec: np.ndarray) -> np.ndarray:
+    """Apply 10*log10 inplace. Non-positive values are set to 0.0 as the single file transforms do.
+    """
+    positive: np.ndarray = spec > 0.0
+    np.log10(spec, out=spec, where=positive)
+    spec *= 10
+    spec[~positive] = 0.0
+    return spec
+
+
+def transform_stft_spectrogram_batch(
+    sound_waves: Sequence[np.ndarray],
+    sample_rate: int,
+    n_fft: int,
+    window_size: int,
+    hop_size: int,
+    apply_log: bool,
+    window: Optional[np.ndarray] = None
+) -> Tuple[Sequence[np.ndarray], np.ndarray, Sequence[np.ndarray]]:
+    """Transform a batch of sound waves to stft-spectrograms.
+
+    The stft of the whole batch is computed with a single fft call. The magnitude of the valid frames is then taken in a numba kernel. The kernel is serial since the collate runs in parallel DataLoader workers.
+
+    Args:
+        sound_waves (Sequence[np.ndarray]): (batch_size, sample_rate*n_secs) The sound waves to be transformed.
+        sample_rate (int): Sample rate of the `sound_waves`.
+        n_fft (int): Number of FFT components.
+        window_size (int): Each frame of audio is windowed by window of length `window_size` and then padded with zeros to match `n_fft`.
+        hop_size (int): Number of audio samples between adjacent STFT columns.
+        apply_log (bool): Wheather or not to apply log10 to the `stft_specs` before return.
+        window (Optional[np.ndarray], optional): (window_size, ) Precomputed stft window. Defaults to None will be fetched from `get_stft_window`.
+
+    Returns:
+        stft_specs (Sequence[np.ndarray]): (batch_size, 1 + n_fft/2, n_frames) The stft of each sound wave.
+        stft_freq (np.ndarray): (1 + n_fft/2, ) Frequencies corresponding to each bin in `stft_specs`. Shared by all the sound waves and read-only.
+        stft_times (Sequence[np.ndarray]): (batch_size, n_frames) Time stamps (in seconds) corresponding to each frame of `stft_specs`.
+    """
+    if window is None:
+        window = get_stft_window(window_size=window_size)
+    padded_waves, n_frames, fft_window = _prepare_frames(
+        sound_waves=sound_waves,
+        n_fft=n_fft,
+        hop_size=hop_size,
+        window=window)
+    stft: np.ndarray = _stft_batch(padded_waves=padded_waves,
+                                   n_fft=n_fft,
+                                   hop_size=hop_size,
+                                   fft_window=fft_window)
+    # (batch_size, max_n_frames, 1 + n_fft/2)
+    stft_mag: np.ndarray = _stft_spectrogram_batch_nb(stft, n_frames)
+    if apply_log is True:
+        stft_mag = _apply_log(stft_mag)
+    stft_freq: np.ndarray = get_fft_frequencies(sample_rate=sample_rate,
+                                                n_fft=n_fft)
+    stft_specs: List[np.ndarray] = list()
+    stft_times: List[np.ndarray] = list()
+    for i, curr_n_frames in enumerate(n_frames):
+        stft_specs.append(stft_mag[i, :curr_n_frames, :].T)
+        stft_times.append(
+            rosa_core.frames_to_time(np.arange(curr_n_frames),
+                                     sr=sample_rate,
+                                     hop_length=hop_size,
+                                     n_fft=n_fft))
+    return stft_specs, stft_freq, stft_times
+
+
+def transform_mel_spectrogram_batch(
+    sound_waves: Sequence[np.ndarray],
+    sample_rate: int,
+    n_fft: int,
+    n_mels: int,
+    freq_min: float,
+    freq_max: float,
+    window_size: int,
+    hop_size: int,
+    apply_log: bool,
+    mel_basis: Optional[np.ndarray] = None,
+    window: Optional[np.ndarray] = None
+) -> Tuple[Sequence[np.ndarray], np.ndarray, Sequence[np.ndarray]]:
+    """Transform a batch of sound waves to mel-spectrograms.
+
+    The stft of the whole batch is computed with a single fft call. Power and mel projection of the valid frames are then fused in a numba kernel. The kernel is serial since the collate runs in parallel DataLoader workers.
+
+    Args:
+        sound_waves (Sequence[np.ndarray]): (batch_size, sample_rate*n_secs) The sound waves to be transformed.
+        sample_rate (int): Sample rate of the `sound_waves`.
+        n_fft (int): Number of FFT components.
+        n_mels (int): Number of Mel bands to generate.
+        freq_min (float): Lowest frequency (in Hz)
+        freq_max (float): Highest frequency (in Hz).
+        window_size (int): Each frame of audio is windowed by window of length `window_size` and then padded with zeros to match `n_fft`.
+        hop_size (int): Number of audio samples between adjacent STFT columns.
+        apply_log (bool): Wheather or not to apply log10 to the `mel_specs` before return.
+        mel_basis (Optional[np.ndarray], optional): (n_mels, 1 + n_fft/2) Precomputed mel filter bank. Defaults to None will be fetched from `get_mel_filter_bank`.
+        window (Optional[np.ndarray], optional): (window_size, ) Precomputed stft window. Defaults to None will be fetched from `get_mel_filter_bank`.
+
+    Returns:
+        mel_specs (Sequence[np.ndarray]): (batch_size, n_mels, n_frames) The mel-spectrogram of each sound wave.
+        mel_freq (np.ndarray): (n_mels, ) Frequencies corresponding to each bin in `mel_specs`. Shared by all the sound waves and read-only.
+        mel_times (Sequence[np.ndarray]): (batch_size, n_frames) Time stamps (in seconds) corresponding to each frame of `mel_specs`.
+    """
+    if mel_basis is None or window is None:
+        mel_basis, window = get_mel_filter_bank(sample_rate=sample_rate,
+                                                n_fft=n_fft,
+                                                n_mels=n_mels,
+                                                freq_min=freq_min,
+                                                freq_max=freq_max,
+                                                window_size=window_size)
+    padded_waves, n_frames, fft_window = _prepare_frames(
+        sound_waves=sound_waves,
+        n_fft=n_fft,
+        hop_size=hop_size,
+        window=window)
+    stft: np.ndarray = _stft_batch(padded_waves=padded_waves,
+                                   n_fft=n_fft,
+                                   hop_size=hop_size,
+                                   fft_window=fft_window)
+    # (batch_size, max_n_frames, n_mels)
+    mel_power: np.ndarray = _mel_spectrogram_batch_nb(stft, n_frames,
+                                                      mel_basis)
+    if apply_log is True:
+        mel_power = _apply_log(mel_power)
+    mel_freq: np.ndarray = get_mel_frequencies(n_mels=n_mels,
+                                               freq_min=freq_min,
+                                               freq_max=freq_max)
+    mel_specs: List[np.ndarray] = list()
+    mel_times: List[np.ndarray] = list()
+    for i, curr_n_frames in enumerate(n_frames):
+        mel_specs.append(mel_power[i, :curr_n_frames, :].T)
+        mel_times.append(
+            rosa_core.frames_to_time(np.arange(curr_n_frames),
+                                     sr=sample_rate,
+                                     hop_length=hop_size,
+                                     n_fft=n_fft))
+    return mel_specs, mel_freq, mel_times
@@ -50,10 +50,12 @@ class MelSpecConfig(STFTSpecConfig):
         n_mels (int): Number of Mel bands to generate. Defaults to 40.
         freq_min (float): Lowest frequency (in Hz). Defaults to 0.0.
         freq_max (float): Highest frequency (in Hz). Defaults to -1.0 will be set to sample_rate/2.0 during runtime.
+        use_cuda (bool): Wheather or not to compute mel-spectrograms on GPU during training when CUDA is available. Defaults to False.
     """
     n_mels: int = field(default=40)
     freq_min: float = field(default=0.0)
     freq_max: float = field(default=-1.0)
+    use_cuda: bool = field(default=False)
 
     @overrides
     def __post_init__(self):
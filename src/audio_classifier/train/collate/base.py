@@ -1,5 +1,4 @@
-from collections import deque
-from typing import Any, Callable, List, MutableSequence, Sequence, Tuple, Union
+from typing import Any, Callable, List, Sequence, Tuple, Union
 
 
 def identity_collate_function(
@@ -12,11 +11,8 @@ def identity_collate_function(
     Returns:
         ret_data (Sequence[Sequence[Any]]): (n_items, batch_size)
     """
-    n_items: int = len(data[0])
-    ret_data: List[MutableSequence[Any]] = [deque() for _ in range(0, n_items)]
-    for data_point in data:
-        for j, item in enumerate(data_point):
-            ret_data[j].append(item)
+    # transpose in one pass, each column is allocated with its final size
+    ret_data: List[List[Any]] = [list(items) for items in zip(*data)]
     return ret_data
 
 
@@ -1,5 +1,5 @@
 from collections import deque
-from typing import Deque, Sequence, Tuple
+from typing import Callable, Deque, Optional, Sequence, Tuple
 
 import numpy as np
 from sklearn_plugins.cluster.spherical_kmeans import SphericalKMeans
@@ -9,13 +9,17 @@ from ....common.feature_engineering import skm_proj
 
 def skm_skl_proj_collate(
     data: Sequence[Tuple[str, Sequence[np.ndarray], np.ndarray, np.ndarray,
-                         int]], skms: Sequence[SphericalKMeans]
+                         int]],
+    skms: Sequence[SphericalKMeans],
+    skm_proj_func: Optional[Callable[[Sequence[np.ndarray]],
+                                     np.ndarray]] = None
 ) -> Sequence[Tuple[str, np.ndarray, np.ndarray, np.ndarray, int]]:
     """For a batch of data, slice and flatten each spectrograms into a list of vectors.
 
     Args:
         data (Sequence[Tuple[str, Sequence[np.ndarray], np.ndarray, np.ndarray, int]]): (batch_size, ) The data from upstream spectrogram transformation function.
-        config (reshape_config.ReshapeConfig): The configuration used to slice spectrogram.
+        skms (Sequence[SphericalKMeans]): All the spherical k-means.
+        skm_proj_func (Optional[Callable[[Sequence[np.ndarray]], np.ndarray]], optional): The function projecting the flat slices of a file, e.g. `skm_proj.FusedSKMProj(skms)`. Defaults to None use `skm_proj.proj_skl_skm` with `skms`.
 
     Returns:
         ret_data (Sequence[Tuple[str, np.ndarray, np.ndarray, np.ndarray, int]]): (batch_size, ) The transformed dataset with each data point being a tuple of (filename, spec_projs, sample_freq, sample_time, label). spec_proj has size (n_slices, n_centroids).
@@ -23,8 +27,12 @@ def skm_skl_proj_collate(
     ret_data: Deque[Tuple[str, np.ndarray, np.ndarray, np.ndarray,
                           int]] = deque()
     for filename, spec_flat_slices, sample_freq, sample_time, label in data:
-        spec_projs: np.ndarray = skm_proj.proj_skl_skm(
-            spec_flat_slices=spec_flat_slices, skms=skms)
+        spec_projs: np.ndarray
+        if skm_proj_func is None:
+            spec_projs = skm_proj.proj_skl_skm(
+                spec_flat_slices=spec_flat_slices, skms=skms)
+        else:
+            spec_projs = skm_proj_func(spec_flat_slices)
         ret_data.append(
             (filename, spec_projs, sample_freq, sample_time, label))
     return ret_data
@@ -0,0 +1,50 @@
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sklearn_plugins.cluster.spherical_kmeans import SphericalKMeans
+
+from ....common.feature_engineering import pool, skm_proj
+from ....config.feature_engineering.pool import PoolConfig
+
+
+def skm_skl_proj_mean_std_pool_collate(
+    data: Sequence[Tuple[str, Sequence[np.ndarray], np.ndarray, np.ndarray,
+                         int]],
+    skms: Sequence[SphericalKMeans],
+    pool_config: PoolConfig,
+    skm_proj_func: Optional[Callable[[Sequence[np.ndarray]],
+                                     np.ndarray]] = None
+) -> Sequence[Tuple[str, np.ndarray, np.ndarray, np.ndarray, int]]:
+    """For a batch of data, project the flat slices to the skm centroids and apply `MeanStdPool` in a single step.
+
+    Equivalent to `skm_skl_proj_collate` followed by `pool_collate` with `MeanStdPool`, without handing the per-slice projections of the whole batch from one collate function to the next.
+
+    Args:
+        data (Sequence[Tuple[str, Sequence[np.ndarray], np.ndarray, np.ndarray, int]]): (batch_size, ) The data from upstream reshape function.
+        skms (Sequence[SphericalKMeans]): All the spherical k-means.
+        pool_config (PoolConfig): The configuration of the pooling window.
+        skm_proj_func (Optional[Callable[[Sequence[np.ndarray]], np.ndarray]], optional): The function projecting the flat slices of a file, e.g. `skm_proj.QuantizedSKMProj(skms)`. Defaults to None use `skm_proj.proj_skl_skm` with `skms`.
+
+    Returns:
+        ret_data (Sequence[Tuple[str, np.ndarray, np.ndarray, np.ndarray, int]]): (batch_size_prime, ) The transformed dataset with each data point being a tuple of (filename, pool_projs, sample_freq, sample_time, label). pool_projs has size (n_slices_prime, 2 * n_centroids). Files shorter than a pooling window are dropped.
+    """
+    ret_data: List[Tuple[str, np.ndarray, np.ndarray, np.ndarray,
+                         int]] = list()
+    for filename, spec_flat_slices, sample_freq, sample_time, label in data:
+        if len(spec_flat_slices) == 0:
+            continue
+        spec_projs: np.ndarray
+        if skm_proj_func is None:
+            spec_projs = skm_proj.proj_skl_skm(
+                spec_flat_slices=spec_flat_slices, skms=skms)
+        else:
+            spec_projs = skm_proj_func(spec_flat_slices)
+        pool_projs: np.ndarray = pool.apply_mean_std_pool(
+            spec_projs=spec_projs,
+            pool_size=pool_config.pool_size,
+            stride_size=pool_config.stride_size)
+        if len(pool_projs) == 0:
+            continue
+        ret_data.append(
+            (filename, pool_projs, sample_freq, sample_time, label))
+    return ret_data
@@ -1,7 +1,11 @@
-from collections import deque
-from typing import Deque, Tuple, Sequence
+import multiprocessing
+from functools import lru_cache
+from typing import List, Tuple, Sequence
 
+import librosa.core as rosa_core
 import numpy as np
+import torch
+from torch.utils.data import get_worker_info
 
 from .....common.preprocessing.spectrogram import transform
 from .....config.preprocessing import spec as conf_spec
@@ -20,39 +24,153 @@ def stft_spectrogram_collate(
     Returns:
         ret_data (Sequence[Tuple[str, np.ndarray, np.ndarray, np.ndarray, int]]): (batch_size, ) The transformed dataset with each data point being a tuple of (filename, stft_spec, stft_freq, stft_time, label).
     """
-    ret_data: Deque[Tuple[str, np.ndarray, np.ndarray, np.ndarray,
-                          int]] = deque()
-    for filename, sound_wave, label in data:
-        stft_spec, stft_freq, stft_time = transform.transform_stft_spectrogram(
-            sound_wave=sound_wave,
-            sample_rate=config.sample_rate,
-            n_fft=config.n_fft,
-            window_size=config.window_size,
-            hop_size=config.hop_size,
-            apply_log=config.apply_log)
-        ret_data.append((filename, stft_spec, stft_freq, stft_time, label))
+    filenames, sound_waves, labels = zip(*data)
+    stft_specs, stft_freq, stft_times = transform.transform_stft_spectrogram_batch(
+        sound_waves=sound_waves,
+        sample_rate=config.sample_rate,
+        n_fft=config.n_fft,
+        window_size=config.window_size,
+        hop_size=config.hop_size,
+        apply_log=config.apply_log)
+    ret_data: List[Tuple[str, np.ndarray, np.ndarray, np.ndarray,
+                         int]] = [None] * len(filenames)
+    for i, (filename, stft_spec, stft_time, label) in enumerate(
+            zip(filenames, stft_specs, stft_times, labels)):
+        ret_data[i] = (filename, stft_spec.astype(np.float32, copy=False),
+                       stft_freq, stft_time, label)
     return ret_data
 
 
+@lru_cache(maxsize=8)
+def _get_torch_mel_filter_bank(
+        sample_rate: int, n_fft: int, n_mels: int, freq_min: float,
+        freq_max: float, window_size: int,
+        device: torch.device) -> Tuple[torch.Tensor, torch.Tensor]:
+    """Get the mel filter bank and the stft window as tensors placed on `device`.
+
+    Returns:
+        mel_basis (torch.Tensor): (n_mels, 1 + n_fft/2) The mel filter bank.
+        window (torch.Tensor): (window_size, ) The hann window.
+    """
+    mel_basis, window = transform.get_mel_filter_bank(sample_rate=sample_rate,
+                                                      n_fft=n_fft,
+                                                      n_mels=n_mels,
+                                                      freq_min=freq_min,
+                                                      freq_max=freq_max,
+                                                      window_size=window_size)
+    return torch.tensor(mel_basis,
+                        device=device), torch.tensor(window, device=device)
+
+
+def _mel_spectrogram_batch_torch(
+    sound_waves: Sequence[np.ndarray], config: conf_spec.MelSpecConfig,
+    freq_max: float, device: torch.device
+) -> Tuple[Sequence[np.ndarray], np.ndarray, Sequence[np.ndarray]]:
+    """Transform a batch of sound waves to mel-spectrograms on `device`.
+
+    The padded batch is transferred to `device` once, and the result is copied back to host memory once.
+
+    Args:
+        sound_waves (Sequence[np.ndarray]): (batch_size, sample_rate*n_secs) The sound waves to be transformed.
+        config (conf_spec.MelSpecConfig): The configuration used to generate mel-spectrogram.
+        freq_max (float): Highest frequency (in Hz).
+        device (torch.device): The device the transformation runs on.
+
+    Returns:
+        mel_specs (Sequence[np.ndarray]): (batch_size, n_mels, n_frames) The mel-spectrogram of each sound wave.
+        mel_freq (np.ndarray): (n_mels, ) Frequencies corresponding to each bin in `mel_specs`.
+        mel_times (Sequence[np.ndarray]): (batch_size, n_frames) Time stamps (in seconds) corresponding to each frame of `mel_specs`.
+    """
+    mel_basis, window = _get_torch_mel_filter_bank(
+        sample_rate=config.sample_rate,
+        n_fft=config.n_fft,
+        n_mels=config.n_mels,
+        freq_min=config.freq_min,
+        freq_max=freq_max,
+        window_size=config.window_size,
+        device=device)
+    padded_waves, lengths = transform.pad_sound_waves(
+        sound_waves=sound_waves, min_length=config.n_fft)
+    n_frames: np.ndarray = np.maximum(
+        (lengths - config.n_fft) // config.hop_size + 1, 0)
+    waves: torch.Tensor = torch.from_numpy(padded_waves)
+    if device.type == "cuda":
+        waves = waves.pin_memory()
+    with torch.no_grad():
+        waves = waves.to(device, non_blocking=True)
+        # (batch_size, 1 + n_fft/2, max_n_frames)
+        stft: torch.Tensor = torch.stft(waves,
+                                        n_fft=config.n_fft,
+                                        hop_length=config.hop_size,
+                                        win_length=config.window_size,
+                                        window=window,
+                                        center=False,
+                                        return_complex=True)
+        stft_power: torch.Tensor = stft.real.square() + stft.imag.square()
+        mel_power: torch.Tensor = torch.matmul(mel_basis, stft_power)
+        if config.apply_log is True:
+            mel_power = 10 * torch.log10(mel_power)
+            mel_power = torch.nan_to_num(mel_power,
+                                         nan=0.0,
+                                         posinf=0.0,
+                                         neginf=0.0)
+        mel_power_np: np.ndarray = mel_power.cpu().numpy()
+    mel_freq: np.ndarray = transform.get_mel_frequencies(
+        n_mels=config.n_mels, freq_min=config.freq_min, freq_max=freq_max)
+    mel_specs: List[np.ndarray] = list()
+    mel_times: List[np.ndarray] = list()
+    for i, curr_n_frames in enumerate(n_frames):
+        mel_specs.append(mel_power_np[i, :, :curr_n_frames])
+        mel_times.append(
+            rosa_core.frames_to_time(np.arange(curr_n_frames),
+                                     sr=config.sample_rate,
+                                     hop_length=config.hop_size,
+                                     n_fft=config.n_fft))
+    return mel_specs, mel_freq, mel_times
+
+
 def mel_spectrogram_collate(
     data: Sequence[Tuple[str, np.ndarray,
                          int]], config: conf_spec.MelSpecConfig
 ) -> Sequence[Tuple[str, np.ndarray, np.ndarray, np.ndarray, int]]:
-    """[summary]
+    """Transfrom a batch of data from time domain signal to mel-spectrogram.
+
+    If `config.use_cuda` is set and CUDA is available, the whole batch is transformed on the GPU.
+    CUDA can not be used in a forked loader worker, so the workers must then be started with "spawn" or "forkserver", see `LoaderConfig.multiprocessing_context`.
 
     Args:
         data (Sequence[Tuple[str, np.ndarray, int]]): (batch_size, ) The data from upstream sound wave dataset loader.
         config (conf_spec.MelSpecConfig): The configuration used to generate mel-spectrogram.
 
+    Raises:
+        RuntimeError: Raised when the GPU transform is requested in a forked loader worker.
+
     Returns:
         ret_data (Sequence[Tuple[str, np.ndarray, np.ndarray, np.ndarray, int]]): (batch_size, ) The transformed dataset with each data point being a tuple of (filename, mel_spec, mel_freq, mel_time, label).
     """
-    ret_data: Deque[Tuple[str, np.ndarray, np.ndarray, np.ndarray,
-                          int]] = deque()
     freq_max: float = config.freq_max if config.freq_max > 0.0 else config.sample_rate / 2.0
-    for filename, sound_wave, label in data:
-        mel_spec, mel_freq, mel_time = transform.transform_mel_spectrogram(
-            sound_wave=sound_wave,
+    filenames, sound_waves, labels = zip(*data)
+    if config.use_cuda is True and torch.cuda.is_available():
+        if get_worker_info() is not None and multiprocessing.get_start_method(
+                allow_none=True) == "fork":
+            raise RuntimeError(
+                "use_cuda can not run in forked loader workers, set num_workers to 0 or multiprocessing_context to \"spawn\""
+            )
+        mel_specs, mel_freq, mel_times = _mel_spectrogram_batch_torch(
+            sound_waves=sound_waves,
+            config=config,
+            freq_max=freq_max,
+            device=torch.device("cuda"))
+    else:
+        mel_basis, window = transform.get_mel_filter_bank(
+            sample_rate=config.sample_rate,
+            n_fft=config.n_fft,
+            n_mels=config.n_mels,
+            freq_min=config.freq_min,
+            freq_max=freq_max,
+            window_size=config.window_size)
+        mel_specs, mel_freq, mel_times = transform.transform_mel_spectrogram_batch(
+            sound_waves=sound_waves,
             sample_rate=config.sample_rate,
             n_fft=config.n_fft,
             n_mels=config.n_mels,
@@ -60,6 +178,13 @@ def mel_spectrogram_collate(
             freq_max=freq_max,
             window_size=config.window_size,
             hop_size=config.hop_size,
-            apply_log=config.apply_log)
-        ret_data.append((filename, mel_spec, mel_freq, mel_time, label))
+            apply_log=config.apply_log,
+            mel_basis=mel_basis,
+            window=window)
+    ret_data: List[Tuple[str, np.ndarray, np.ndarray, np.ndarray,
+                         int]] = [None] * len(filenames)
+    for i, (filename, mel_spec, mel_time, label) in enumerate(
+            zip(filenames, mel_specs, mel_times, labels)):
+        ret_data[i] = (filename, mel_spec.astype(np.float32, copy=False),
+                       mel_freq, mel_time, label)
     return ret_data
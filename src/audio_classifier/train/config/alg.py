@@ -29,8 +29,28 @@ class MLConfigBase(ABC):
            unsafe_hash=False,
            frozen=False)
 class PCAConfig(MLConfigBase):
-    n_components: float = field(default=0.8)
+    """Configuration of the PCA.
+
+    Attributes:
+        n_components (Union[int, float]): Number of components if at least 1, otherwise the ratio of variance to be kept. The randomized svd solver and `incremental` only apply to an integer number of components, a variance ratio always uses the full svd.
+        whiten (bool): Whiten the components.
+        incremental (bool): Use `IncrementalPCA`, fitted batch by batch.
+        batch_size (Optional[int]): Batch size of `IncrementalPCA`. Defaults to None uses 4 times `n_components`.
+        random_state (Optional[int]): Seed of the randomized svd solver.
+    """
+    n_components: Union[int, float] = field(default=0.8)
     whiten: bool = field(default=True)
+    incremental: bool = field(default=False)
+    batch_size: Optional[int] = field(default=None)
+    random_state: Optional[int] = field(default=None)
+
+    def __post_init__(self):
+        if self.n_components >= 1:
+            self.n_components = int(self.n_components)
+        if isinstance(self.batch_size, str):
+            self.batch_size = None
+        if isinstance(self.random_state, str):
+            self.random_state = None
 
 
 @dataclass_json
@@ -43,6 +63,7 @@ class PCAConfig(MLConfigBase):
 class SKMConfig(PCAConfig):
     normalize: bool = field(default=True)
     standardize: bool = field(default=True)
+    quantize: bool = field(default=False)
 
 
 @dataclass_json
@@ -53,14 +74,24 @@ class SKMConfig(PCAConfig):
            unsafe_hash=False,
            frozen=False)
 class SVCConfig(MLConfigBase):
+    """Configuration of the SVC.
+
+    Attributes:
+        backend (str): One of `sklearn`, `thundersvm`, `cuml` or `sgd`. `sgd` trains a linear SVM with `SGDClassifier` and requires `kernel` to be `linear`.
+        sgd_epochs (int): Number of shuffled passes over the training slices. Only used by the `sgd` backend.
+    """
     C: float = field(default=0.5)
     kernel: str = field(default="rbf")
     degree: int = field(default=3)
     gamma: Union[str, float] = field(default="scale")
     coef0: float = field(default=0.0)
+    cache_size: float = field(default=1000.0)
+    backend: str = field(default="sklearn")
+    sgd_epochs: int = field(default=10)
 
     def __post_init__(self):
         self.kernel = str.lower(self.kernel)
+        self.backend = str.lower(self.backend)
         if isinstance(self.gamma, str):
             self.gamma = str.lower(self.gamma)
 
@@ -1,3 +1,4 @@
+import os
 from abc import ABC
 from argparse import ArgumentParser, HelpFormatter
 from dataclasses import dataclass, field
@@ -14,12 +15,28 @@ from dataclasses_json import dataclass_json
            unsafe_hash=False,
            frozen=False)
 class LoaderConfig():
+    """Configuration of the torch DataLoader.
 
+    Attributes:
+        num_workers (int): Number of worker processes. Negative value uses half of the available cpus.
+        batch_size (int): Number of files collated together.
+        pin_memory (bool): Copy tensors into pinned memory before returning them. Only used when `num_workers > 0`.
+        prefetch_factor (int): Number of batches loaded in advance by each worker. Only used when `num_workers > 0`.
+        persistent_workers (bool): Keep the workers alive after the dataset has been consumed once. Loaders iterated more than once, e.g. to fit an `IncrementalPCA`, turn it on regardless. Only used when `num_workers > 0`.
+        multiprocessing_context (Optional[str]): Start method of the workers, e.g. "spawn", which is required to compute mel-spectrograms on GPU in the workers. Defaults to None use the platform default. Only used when `num_workers > 0`.
+    """
     num_workers: int = field(default=0)
     batch_size: int = field(default=1)
+    pin_memory: bool = field(default=False)
+    prefetch_factor: int = field(default=4)
+    persistent_workers: bool = field(default=False)
+    multiprocessing_context: Optional[str] = field(default=None)
 
     def __post_init__(self):
-        pass
+        if self.num_workers < 0:
+            self.num_workers = max(os.cpu_count() // 2, 1)
+        if self.multiprocessing_context == "":
+            self.multiprocessing_context = None
 
 
 def get_loader_config_from_json(config_file_path: str) -> LoaderConfig:
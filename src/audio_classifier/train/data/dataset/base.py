@@ -64,6 +64,32 @@ class FolderDataset(Dataset):
     def __len__(self):
         return len(self.__filenames)
 
+    @property
+    def folder_path(self) -> str:
+        """The path to the folder containing *.wav files."""
+        return self.__folder_path
+
+    @property
+    def sample_rate(self) -> int:
+        """The sample rate of the audio."""
+        return self.__sample_rate
+
+    @property
+    def filenames(self) -> List[str]:
+        """The filenames of all the data points, in index order."""
+        return list(self.__filenames)
+
+    def get_label(self, index: int) -> int:
+        """Get the class label of a data point without loading the audio.
+
+        Args:
+            index (int): The index of the queried data point.
+
+        Returns:
+            label (int): The class lable of the queried data point.
+        """
+        return self.__filename_to_label_func(self.__filenames[index])
+
     def __load_single_audio(self, index: int) -> Tuple[str, np.ndarray, int]:
         """Load the sound wave from the filesystem.
 
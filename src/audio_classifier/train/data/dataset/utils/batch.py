@@ -1,5 +1,4 @@
-from collections import deque
-from typing import Any, Deque, List, MutableSequence, Sequence
+from typing import Any, Deque, List, Sequence
 
 
 def combine_batches(
@@ -15,15 +14,11 @@ def combine_batches(
     Returns:
         ret_data Sequence[Sequence[Any]]: (n_items_output, n_total_data_points)
     """
-    n_items_output: int = len(batches_tmp[0])
-    ret_data: List[MutableSequence[Any]] = [
-        deque() for _ in range(n_items_output)
-    ]
+    # a batch can be empty if every data point was dropped by the collate function
+    n_items_output: int = max([len(batch) for batch in batches_tmp])
+    ret_data: List[List[Any]] = [list() for _ in range(n_items_output)]
     while len(batches_tmp) > 0:
         curr_batch: Sequence[Sequence] = batches_tmp.popleft()
         for i, curr_item in enumerate(curr_batch):
             ret_data[i].extend(curr_item)
-    # back to list all at once
-    for i, curr_item in enumerate(ret_data):
-        ret_data[i] = list(ret_data[i])
     return ret_data
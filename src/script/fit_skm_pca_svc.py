@@ -1,7 +1,8 @@
 from argparse import ArgumentParser, Namespace
 from collections import deque
+from dataclasses import replace
 from functools import partial
-from typing import Deque, List, Sequence, Union
+from typing import Callable, Deque, List, Optional, Sequence, Union
 
 import audio_classifier.common.feature_engineering.pool as feature_pool
 import audio_classifier.common.feature_engineering.skm_proj as feature_skm_proj
@@ -12,8 +13,7 @@ import audio_classifier.config.preprocessing.reshape as conf_reshape
 import audio_classifier.config.preprocessing.spec as conf_spec
 import audio_classifier.train.collate.augment.sound_wave as collate_augment_sound_wave
 import audio_classifier.train.collate.base as collate_base
-import audio_classifier.train.collate.feature_engineering.pool as collate_pool
-import audio_classifier.train.collate.feature_engineering.skm as collate_skm
+import audio_classifier.train.collate.feature_engineering.skm_pool as collate_skm_pool
 import audio_classifier.train.collate.preprocessing.spectrogram.reshape as collate_reshape
 import audio_classifier.train.collate.preprocessing.spectrogram.transform as collate_transform
 import audio_classifier.train.config.alg as conf_alg
@@ -27,9 +27,8 @@ from script.train import train_common
 from script.train.classification import classify_common
 from script.train.feature_engineering import feature_common
 from sklearn.base import ClassifierMixin
-from sklearn.decomposition import PCA
+from sklearn.decomposition import PCA, IncrementalPCA
 from sklearn.pipeline import Pipeline
-from sklearn.svm import SVC
 from sklearn_plugins.cluster import SphericalKMeans
 from sklearn_plugins.cluster.spherical_kmeans import SphericalKMeans
 from torch.utils.data.dataloader import DataLoader
@@ -76,6 +75,7 @@ class FitSkmPcaSvcConfigs():
     neg_test_audio_path: str
     export_path: str
     export_filename: str
+    cache_path: Optional[str]
     k_vals: Sequence[int]
 
     def __init__(self, argv: Namespace):
@@ -104,6 +104,7 @@ class FitSkmPcaSvcConfigs():
             pca_config_path, conf_alg.PCAConfig)
         self.svc_config = conf_alg.get_alg_config_from_json(
             svc_config_path, conf_alg.SVCConfig)
+        classify_common.check_svc_config(svc_config=self.svc_config)
         self.pool_config = conf_pool.get_pool_config_from_json(
             pool_config_path)
         self.loader_config = conf_loader.get_loader_config_from_json(
@@ -112,6 +113,7 @@ class FitSkmPcaSvcConfigs():
         self.neg_test_audio_path = argv.neg_test_audio_path
         self.export_path = argv.export_path
         self.export_filename = argv.export_filename
+        self.cache_path = argv.cache_path
         self.k_vals = argv.k_vals
 
 
@@ -135,6 +137,11 @@ def get_argparse() -> ArgumentParser:
                         required=True,
                         help="the export path")
     parser.add_argument("--export_filename", type=str, default="metrics.pkl")
+    parser.add_argument(
+        "--cache_path",
+        type=str,
+        default=None,
+        help="directory used to cache the preprocessed spectrogram slices")
     return parser
 
 
@@ -146,31 +153,13 @@ def parse_args(args: List[str]) -> Namespace:
 
 def fit_skms(k_vals: Sequence[int], dataset: Dataset,
              configs: FitSkmPcaSvcConfigs):
-    collate_func: CollateFuncType = collate_base.EnsembleCollateFunction(
-        collate_funcs=[
-            partial(collate_transform.mel_spectrogram_collate,
-                    config=configs.mel_spec_config),
-            partial(collate_reshape.slice_flatten_collate,
-                    config=configs.reshape_config)
-        ])
-    # load and preprocess incoming audio
-    loader = DataLoader(dataset=dataset,
-                        collate_fn=collate_func,
-                        num_workers=configs.loader_config.num_workers,
-                        batch_size=configs.loader_config.batch_size)
-    batches_tmp: Deque[Sequence[Sequence]] = deque()
-    np.seterr(divide="ignore")
-    for batch in loader:
-        batches_tmp.append(batch)
-    np.seterr(divide="ignore")
-    filenames, flat_slices, sample_freqs, sample_times, labels = batch_utils.combine_batches(
-        batches_tmp)
-    # the actual data used to fit skm
-    train = feature_common.SliceDataset(filenames=filenames,
-                                        flat_slices=flat_slices,
-                                        sample_freqs=sample_freqs,
-                                        sample_times=sample_times,
-                                        labels=labels)
+    # load and preprocess incoming audio, the actual data used to fit skm
+    train: feature_common.SliceDataset = feature_common.load_slice_dataset(
+        dataset=dataset,
+        mel_spec_config=configs.mel_spec_config,
+        reshape_config=configs.reshape_config,
+        loader_config=configs.loader_config,
+        cache_path=configs.cache_path)
     slices, labels = feature_common.convert_to_ndarray(slice_dataset=train)
     unique_labels: np.ndarray = np.unique(labels)
     skms: List[SphericalKMeans] = list()
@@ -199,21 +188,36 @@ def train_classifier(dataset: Dataset, skms: Sequence[SphericalKMeans],
                     config=configs.mel_spec_config),
             partial(collate_reshape.slice_flatten_collate,
                     config=configs.reshape_config),
-            partial(collate_skm.skm_skl_proj_collate, skms=skms),
-            partial(collate_pool.pool_collate,
-                    pool_func=feature_pool.MeanStdPool(),
-                    pool_config=configs.pool_config)
+            partial(collate_skm_pool.skm_skl_proj_mean_std_pool_collate,
+                    skms=skms,
+                    pool_config=configs.pool_config,
+                    skm_proj_func=feature_skm_proj.get_skl_skm_proj_func(
+                        skms=skms, quantize=configs.skm_config.quantize))
         ])
+    pca: Union[PCA, IncrementalPCA] = classify_common.get_pca(
+        pca_config=configs.pca_config)
+    loader_config: conf_loader.LoaderConfig = configs.loader_config
+    if isinstance(pca, IncrementalPCA):
+        # the loader is iterated twice, once to fit and once to transform
+        loader_config = replace(loader_config, persistent_workers=True)
     # load and preprocess incoming audio
-    loader = DataLoader(dataset=dataset,
-                        collate_fn=collate_func,
-                        num_workers=configs.loader_config.num_workers,
-                        batch_size=configs.loader_config.batch_size)
+    loader: DataLoader = train_common.get_data_loader(
+        dataset=dataset,
+        collate_function=collate_func,
+        loader_config=loader_config)
+    if isinstance(pca, IncrementalPCA):
+        # only the reduced slices are kept in memory
+        train_reduced, train_labels = classify_common.fit_transform_incremental_pca(
+            loader=loader, pca=pca)
+        svc = classify_common.get_svc(svc_config=configs.svc_config,
+                                      n_samples=len(train_reduced))
+        svc.fit(train_reduced, train_labels)
+        train_acc: float = svc.score(train_reduced, train_labels)
+        return Pipeline(steps=[("pca", pca), ("svc", svc)]), train_acc
     batches_tmp: Deque[Sequence[Sequence]] = deque()
-    np.seterr(divide="ignore")
-    for batch in loader:
-        batches_tmp.append(batch)
-    np.seterr(divide="ignore")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for batch in loader:
+            batches_tmp.append(batch)
     filenames, all_file_spec_projs, sample_freqs, sample_times, labels = batch_utils.combine_batches(
         batches_tmp)
     proj_dataset = classify_common.ProjDataset(
@@ -225,14 +229,8 @@ def train_classifier(dataset: Dataset, skms: Sequence[SphericalKMeans],
     train_slices, train_labels = classify_common.convert_to_ndarray(
         all_file_spec_projs=proj_dataset.all_file_spec_projs,
         labels=proj_dataset.labels)
-    pca = PCA(n_components=configs.pca_config.n_components,
-              whiten=configs.pca_config.whiten,
-              copy=True)
-    svc = SVC(C=configs.svc_config.C,
-              kernel=configs.svc_config.kernel,
-              degree=configs.svc_config.degree,
-              gamma=configs.svc_config.gamma,
-              coef0=configs.svc_config.coef0)
+    svc = classify_common.get_svc(svc_config=configs.svc_config,
+                                  n_samples=len(train_slices))
     pca_svc = Pipeline(steps=[("pca", pca), ("svc", svc)])
     pca_svc.fit(train_slices, train_labels)
     train_acc: float = pca_svc.score(train_slices, train_labels)
@@ -247,21 +245,21 @@ def val_classifier(dataset: Dataset, skms: Sequence[SphericalKMeans],
                     config=configs.mel_spec_config),
             partial(collate_reshape.slice_flatten_collate,
                     config=configs.reshape_config),
-            partial(collate_skm.skm_skl_proj_collate, skms=skms),
-            partial(collate_pool.pool_collate,
-                    pool_func=feature_pool.MeanStdPool(),
-                    pool_config=configs.pool_config)
+            partial(collate_skm_pool.skm_skl_proj_mean_std_pool_collate,
+                    skms=skms,
+                    pool_config=configs.pool_config,
+                    skm_proj_func=feature_skm_proj.get_skl_skm_proj_func(
+                        skms=skms, quantize=configs.skm_config.quantize))
         ])
     # load and preprocess incoming audio
-    loader = DataLoader(dataset=dataset,
-                        collate_fn=collate_func,
-                        num_workers=configs.loader_config.num_workers,
-                        batch_size=configs.loader_config.batch_size)
+    loader: DataLoader = train_common.get_data_loader(
+        dataset=dataset,
+        collate_function=collate_func,
+        loader_config=configs.loader_config)
     batches_tmp: Deque[Sequence[Sequence]] = deque()
-    np.seterr(divide="ignore")
-    for batch in loader:
-        batches_tmp.append(batch)
-    np.seterr(divide="ignore")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for batch in loader:
+            batches_tmp.append(batch)
     filenames, all_file_spec_projs, sample_freqs, sample_times, labels = batch_utils.combine_batches(
         batches_tmp)
     proj_dataset = classify_common.ProjDataset(
@@ -277,8 +275,13 @@ def val_classifier(dataset: Dataset, skms: Sequence[SphericalKMeans],
     return val_acc
 
 
-def infer_single_audio(file_path: str, skms: Sequence[SphericalKMeans],
-                       classifier: Pipeline, configs: FitSkmPcaSvcConfigs):
+def infer_single_audio(
+    file_path: str,
+    skms: Sequence[SphericalKMeans],
+    classifier: Pipeline,
+    configs: FitSkmPcaSvcConfigs,
+    skm_proj_func: Optional[Callable[[Sequence[np.ndarray]],
+                                     np.ndarray]] = None):
     sound_wave, _ = rosa_core.load(path=file_path,
                                    sr=configs.mel_spec_config.sample_rate,
                                    mono=True)
@@ -292,18 +295,16 @@ def infer_single_audio(file_path: str, skms: Sequence[SphericalKMeans],
         window_size=configs.mel_spec_config.window_size,
         hop_size=configs.mel_spec_config.window_size,
         apply_log=configs.mel_spec_config.apply_log)
-    slices: Sequence[np.ndarray] = spec_reshape.slice_spectrogram(
+    flat_slices: np.ndarray = spec_reshape.slice_flatten_spectrogram(
         spectrogram=mel_spec,
         slice_size=configs.reshape_config.slice_size,
         stride_size=configs.reshape_config.stride_size)
-    flat_slices: Sequence[np.ndarray] = list()
-    for slice in slices:
-        flat: np.ndarray = spec_reshape.flatten_slice(slice, copy=True)
-        flat_slices.append(flat)
-    proj_slices: np.ndarray = feature_skm_proj.proj_skl_skm(flat_slices, skms)
-    pool_slices: Sequence[np.ndarray] = feature_pool.apply_pool_func(
+    if skm_proj_func is None:
+        skm_proj_func = feature_skm_proj.get_skl_skm_proj_func(
+            skms=skms, quantize=configs.skm_config.quantize)
+    proj_slices: np.ndarray = skm_proj_func(flat_slices)
+    pool_slices: np.ndarray = feature_pool.apply_mean_std_pool(
         spec_projs=proj_slices,
-        pool_func=feature_pool.MeanStdPool(),
         pool_size=configs.pool_config.pool_size,
         stride_size=configs.pool_config.stride_size)
     pred = classifier.predict(np.asarray(pool_slices))
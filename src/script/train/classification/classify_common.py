@@ -1,18 +1,25 @@
-from collections import deque
 from dataclasses import dataclass, field
-from typing import Sequence, Tuple, Union
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 
+import audio_classifier.train.config.alg as conf_alg
 import audio_classifier.train.config.loader as conf_loader
 import audio_classifier.train.data.dataset.composite as dataset_composite
 import numpy as np
 from sklearn.base import ClassifierMixin
+from sklearn.decomposition import PCA, IncrementalPCA
+from sklearn.linear_model import SGDClassifier
 from sklearn.pipeline import Pipeline
+from sklearn.svm import SVC
+from torch.utils.data.dataloader import DataLoader
 
 from .. import train_common
 
 MetaDataType = train_common.MetaDataType
 CollateFuncType = train_common.CollateFuncType
 
+# sklearn kernel names that thundersvm spells differently
+_THUNDERSVM_KERNELS: Dict[str, str] = {"poly": "polynomial"}
+
 
 @dataclass
 class ProjDataset:
@@ -40,13 +47,12 @@ def generate_proj_dataset(
         train_dataset (ProjDataset): Training dataset.
         val_dataset (ProjDataset): Validation dataset.
     """
-    np.seterr(divide="ignore")
-    ret_raw_datasets = train_common.generate_dataset(
-        curr_val_fold=curr_val_fold,
-        dataset_generator=dataset_generator,
-        collate_function=collate_function,
-        loader_config=loader_config)
-    np.seterr(divide="warn")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ret_raw_datasets = train_common.generate_dataset(
+            curr_val_fold=curr_val_fold,
+            dataset_generator=dataset_generator,
+            collate_function=collate_function,
+            loader_config=loader_config)
     ret_datasets: Sequence[ProjDataset] = list()
     for curr_raw_dataset in ret_raw_datasets:
         filenames, all_file_spec_projs, sample_freqs, sample_times, labels = curr_raw_dataset
@@ -60,6 +66,209 @@ def generate_proj_dataset(
     return ret_datasets[0], ret_datasets[1]
 
 
+def get_pca(pca_config: conf_alg.PCAConfig) -> Union[PCA, IncrementalPCA]:
+    """Get an unfitted PCA according to the configuration.
+
+    Args:
+        pca_config (conf_alg.PCAConfig): The PCA configuration.
+
+    Raises:
+        ValueError: Raised when `pca_config.incremental` is set but `pca_config.n_components` is a variance ratio.
+
+    Returns:
+        pca (Union[PCA, IncrementalPCA]): `IncrementalPCA` if `pca_config.incremental` is set, otherwise `PCA` using randomized svd whenever `pca_config.n_components` is an integer.
+    """
+    if pca_config.incremental is False:
+        # randomized svd only supports an explicit number of components
+        if isinstance(pca_config.n_components, int):
+            return PCA(n_components=pca_config.n_components,
+                       whiten=pca_config.whiten,
+                       copy=True,
+                       svd_solver="randomized",
+                       iterated_power=4,
+                       random_state=pca_config.random_state)
+        return PCA(n_components=pca_config.n_components,
+                   whiten=pca_config.whiten,
+                   copy=True,
+                   random_state=pca_config.random_state)
+    if not isinstance(pca_config.n_components, int):
+        raise ValueError(
+            str.format(
+                "incremental pca requires an integer n_components, got {}",
+                pca_config.n_components))
+    batch_size: int = pca_config.batch_size
+    if batch_size is None:
+        batch_size = 4 * pca_config.n_components
+    return IncrementalPCA(n_components=pca_config.n_components,
+                          whiten=pca_config.whiten,
+                          batch_size=batch_size)
+
+
+def check_svc_config(svc_config: conf_alg.SVCConfig):
+    """Check that the SVC configuration can be honored, before any data is loaded.
+
+    Args:
+        svc_config (conf_alg.SVCConfig): The SVC configuration.
+
+    Raises:
+        ValueError: Raised when `svc_config.backend` is unknown, when `thundersvm` is used with `gamma="scale"`, which it does not support, or when `sgd` is used with a non linear kernel.
+    """
+    if svc_config.backend not in ("sklearn", "thundersvm", "cuml", "sgd"):
+        raise ValueError(
+            str.format("unknown svc backend {}", svc_config.backend))
+    if svc_config.backend == "thundersvm" and svc_config.gamma == "scale":
+        raise ValueError(
+            "thundersvm does not support gamma=\"scale\", use \"auto\" or a float"
+        )
+    if svc_config.backend == "sgd" and svc_config.kernel != "linear":
+        raise ValueError(
+            str.format("sgd only trains a linear svm, got kernel {}",
+                       svc_config.kernel))
+
+
+def get_svc(svc_config: conf_alg.SVCConfig,
+            n_samples: Optional[int] = None) -> ClassifierMixin:
+    """Get an unfitted SVC from the backend selected in the configuration.
+
+    `sklearn` uses the single threaded libsvm solver. `thundersvm` and `cuml` train on the GPU and are only imported when selected. The sklearn kernel names are translated to the ones of `thundersvm`. `sgd` is a linear SVM trained by `SGDClassifier` with hinge loss for `svc_config.sgd_epochs` shuffled epochs, whose regularization `alpha = 1 / (C * n_samples)` matches the `C` of the libsvm objective.
+
+    Args:
+        svc_config (conf_alg.SVCConfig): The SVC configuration.
+        n_samples (Optional[int], optional): The number of training samples, required by the `sgd` backend. Defaults to None.
+
+    Raises:
+        ValueError: Raised when `check_svc_config` fails, or when `sgd` is used without `n_samples`.
+
+    Returns:
+        svc (ClassifierMixin): The SVC with the sklearn `fit`/`predict`/`score` interface.
+    """
+    check_svc_config(svc_config=svc_config)
+    if svc_config.backend == "sklearn":
+        return SVC(C=svc_config.C,
+                   kernel=svc_config.kernel,
+                   degree=svc_config.degree,
+                   gamma=svc_config.gamma,
+                   coef0=svc_config.coef0,
+                   cache_size=svc_config.cache_size)
+    if svc_config.backend == "thundersvm":
+        from thundersvm import SVC as ThunderSVC
+        kernel: str = _THUNDERSVM_KERNELS.get(svc_config.kernel,
+                                              svc_config.kernel)
+        return ThunderSVC(C=svc_config.C,
+                          kernel=kernel,
+                          degree=svc_config.degree,
+                          gamma=svc_config.gamma,
+                          coef0=svc_config.coef0)
+    if svc_config.backend == "cuml":
+        from cuml.svm import SVC as CuSVC
+        return CuSVC(C=svc_config.C,
+                     kernel=svc_config.kernel,
+                     degree=svc_config.degree,
+                     gamma=svc_config.gamma,
+                     coef0=svc_config.coef0,
+                     cache_size=svc_config.cache_size)
+    # sgd
+    if n_samples is None or n_samples <= 0:
+        raise ValueError("sgd requires the number of training samples")
+    return SGDClassifier(loss="hinge",
+                         alpha=1.0 / (svc_config.C * n_samples),
+                         max_iter=svc_config.sgd_epochs,
+                         tol=None,
+                         shuffle=True)
+
+
+class IncrementalPCAFitter:
+    """Fit an `IncrementalPCA` on slices as they are produced by the loader.
+
+    Incoming slices are buffered and fed to `partial_fit` in chunks of `pca.batch_size`. At least one chunk is kept in the buffer until `finalize` so that the last `partial_fit` call never receives fewer samples than `pca.n_components`.
+
+    Attributes:
+        pca (IncrementalPCA): The pca being fitted.
+    """
+    pca: IncrementalPCA
+    _buffer: List[np.ndarray]
+    _n_buffered: int
+
+    def __init__(self, pca: IncrementalPCA):
+        self.pca = pca
+        self._buffer = list()
+        self._n_buffered = 0
+
+    def partial_fit(self, slices: np.ndarray):
+        """Buffer the slices and fit every full chunk except the last one.
+
+        Args:
+            slices (np.ndarray): (n_slices, n_features) The incoming slices.
+        """
+        if len(slices) == 0:
+            return
+        self._buffer.append(slices)
+        self._n_buffered += len(slices)
+        batch_size: int = self.pca.batch_size
+        if self._n_buffered < 2 * batch_size:
+            return
+        buffered: np.ndarray = np.concatenate(self._buffer, axis=0)
+        n_fit: int = (self._n_buffered // batch_size - 1) * batch_size
+        for start in range(0, n_fit, batch_size):
+            self.pca.partial_fit(buffered[start:start + batch_size])
+        self._buffer = [buffered[n_fit:]]
+        self._n_buffered = len(buffered) - n_fit
+
+    def finalize(self) -> IncrementalPCA:
+        """Fit the remaining buffered slices.
+
+        Returns:
+            pca (IncrementalPCA): The fitted pca.
+        """
+        if self._n_buffered > 0:
+            self.pca.partial_fit(np.concatenate(self._buffer, axis=0))
+        self._buffer = list()
+        self._n_buffered = 0
+        return self.pca
+
+
+def fit_transform_incremental_pca(
+        loader: DataLoader,
+        pca: IncrementalPCA) -> Tuple[np.ndarray, np.ndarray]:
+    """Fit an `IncrementalPCA` and reduce the slices produced by the loader, one batch at a time.
+
+    The first pass over `loader` fits the pca batch by batch. The second pass transforms each batch, so only the reduced slices are ever kept in memory.
+
+    Args:
+        loader (DataLoader): The loader producing batches of (filenames, all_file_spec_projs, sample_freqs, sample_times, labels).
+        pca (IncrementalPCA): The unfitted pca, fitted inplace.
+
+    Returns:
+        reduced_slices (np.ndarray): (n_slices, n_components) The reduced slices of all batches.
+        slice_labels (np.ndarray): (n_slices, ) The class label correspond to each slice.
+    """
+    pca_fitter = IncrementalPCAFitter(pca=pca)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for batch in loader:
+            _, batch_spec_projs, _, _, batch_labels = batch
+            batch_slices, _ = convert_to_ndarray(
+                all_file_spec_projs=batch_spec_projs, labels=batch_labels)
+            pca_fitter.partial_fit(batch_slices)
+    pca_fitter.finalize()
+    all_reduced: List[np.ndarray] = list()
+    all_labels: List[np.ndarray] = list()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for batch in loader:
+            _, batch_spec_projs, _, _, batch_labels = batch
+            batch_slices, batch_labels = convert_to_ndarray(
+                all_file_spec_projs=batch_spec_projs, labels=batch_labels)
+            if len(batch_slices) == 0:
+                continue
+            all_reduced.append(pca.transform(batch_slices))
+            all_labels.append(batch_labels)
+    if len(all_reduced) == 0:
+        return np.empty((0, pca.n_components_)), np.empty((0, ),
+                                                          dtype=np.int64)
+    reduced_slices: np.ndarray = np.concatenate(all_reduced, axis=0)
+    slice_labels: np.ndarray = np.concatenate(all_labels, axis=0)
+    return reduced_slices, slice_labels
+
+
 def report_slices_acc(classifier: Union[ClassifierMixin, Pipeline],
                       train: ProjDataset,
                       val: ProjDataset,
@@ -127,11 +336,6 @@ def convert_to_ndarray(all_file_spec_projs: Sequence[Sequence[np.ndarray]],
         spec_projs (np.ndarray): (n_slices, n_clusters) The current training projs
         spec_labels (np.ndarray): (n_slices, ) The class label correspond to each slice.
     """
-    spec_projs_list: Sequence[np.ndarray] = deque()
-    labels_list: Sequence[int] = deque()
-    for curr_file_spec_projs, curr_label in zip(all_file_spec_projs, labels):
-        spec_projs_list.extend(curr_file_spec_projs)
-        labels_list.extend([curr_label] * len(curr_file_spec_projs))
-    spec_projs: np.ndarray = np.array(spec_projs_list)
-    spec_labels: np.ndarray = np.array(labels_list)
+    spec_projs, spec_labels = train_common.concatenate_file_rows(
+        all_file_rows=all_file_spec_projs, labels=labels)
     return spec_projs, spec_labels
@@ -10,7 +10,6 @@ import audio_classifier.train.config.alg as conf_alg
 import audio_classifier.train.config.dataset as conf_dataset
 import audio_classifier.train.config.loader as conf_loader
 import numpy as np
-from sklearn.decomposition import PCA
 from sklearn.pipeline import Pipeline
 from sklearn.ensemble import RandomForestClassifier
 
@@ -100,9 +99,7 @@ def train_pca_rfc_np(curr_val_fold: int,
                      model_path_stub: str = "val_{:02d}.pkl") -> Pipeline:
     curr_val_model_path = path.join(export_path,
                                     str.format(model_path_stub, curr_val_fold))
-    pca = PCA(n_components=pca_config.n_components,
-              whiten=pca_config.whiten,
-              copy=True)
+    pca = classify_common.get_pca(pca_config=pca_config)
     rfc = RandomForestClassifier(
         n_estimators=rfc_config.n_estimators,
         criterion=rfc_config.criterion,
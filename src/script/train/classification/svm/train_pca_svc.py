@@ -1,5 +1,6 @@
 import pickle
 from argparse import ArgumentParser, Namespace
+from dataclasses import replace
 from os import path
 from typing import List
 
@@ -10,9 +11,7 @@ import audio_classifier.train.config.alg as conf_alg
 import audio_classifier.train.config.dataset as conf_dataset
 import audio_classifier.train.config.loader as conf_loader
 import numpy as np
-from sklearn.decomposition import PCA
 from sklearn.pipeline import Pipeline
-from sklearn.svm import SVC
 
 from ... import train_common
 from .. import classify_common
@@ -39,6 +38,13 @@ def get_argparse() -> ArgumentParser:
                         type=str,
                         required=True,
                         help="the export path")
+    parser.add_argument(
+        "--n_jobs",
+        type=int,
+        default=1,
+        help=
+        "number of folds trained in parallel, the loader workers are divided among them and forked"
+    )
     return parser
 
 
@@ -48,6 +54,26 @@ def parse_args(args: List[str]) -> Namespace:
     return argv
 
 
+def get_fold_loader_config(loader_config: conf_loader.LoaderConfig,
+                           n_jobs: int) -> conf_loader.LoaderConfig:
+    """Get the loader config of one of `n_jobs` folds trained in parallel.
+
+    The loader workers are divided among the folds. Each fold runs inside a loky worker, whose default start method can not start DataLoader workers, so the workers are forked explicitly.
+
+    Args:
+        loader_config (conf_loader.LoaderConfig): The loader config shared by all folds.
+        n_jobs (int): Number of folds trained in parallel.
+
+    Returns:
+        conf_loader.LoaderConfig: The loader config of a single fold.
+    """
+    if n_jobs <= 1:
+        return loader_config
+    return replace(loader_config,
+                   num_workers=loader_config.num_workers // n_jobs,
+                   multiprocessing_context="fork")
+
+
 def get_config(argv: Namespace):
     DATASET_CONFIG_PATH: str = argv.dataset_config_path
     SPEC_CONFIG_PATH: str = argv.spec_config_path
@@ -68,6 +94,7 @@ def get_config(argv: Namespace):
         PCA_CONFIG_PATH, conf_alg.PCAConfig)
     svc_config: conf_alg.SVCConfig = conf_alg.get_alg_config_from_json(
         SVC_CONFIG_PATH, conf_alg.SVCConfig)
+    classify_common.check_svc_config(svc_config=svc_config)
     pool_config: conf_pool.PoolConfig = conf_pool.get_pool_config_from_json(
         POOL_CONFIG_PATH)
     return dataset_config, mel_spec_config, reshape_config, pool_config, pca_config, svc_config, loader_config
@@ -100,14 +127,9 @@ def train_pca_svc_np(curr_val_fold: int,
                      model_path_stub: str = "val_{:02d}.pkl") -> Pipeline:
     curr_val_model_path = path.join(export_path,
                                     str.format(model_path_stub, curr_val_fold))
-    pca = PCA(n_components=pca_config.n_components,
-              whiten=pca_config.whiten,
-              copy=True)
-    svc = SVC(C=svc_config.C,
-              kernel=svc_config.kernel,
-              degree=svc_config.degree,
-              gamma=svc_config.gamma,
-              coef0=svc_config.coef0)
+    pca = classify_common.get_pca(pca_config=pca_config)
+    svc = classify_common.get_svc(svc_config=svc_config,
+                                  n_samples=len(train_slices))
     pca_svc = Pipeline(steps=[("pca", pca), ("svc", svc)])
     pca_svc.fit(train_slices, train_labels)
     with open(curr_val_model_path, "wb") as pipeline_file:
@@ -10,7 +10,7 @@ import audio_classifier.train.config.alg as conf_alg
 import audio_classifier.train.config.dataset as conf_dataset
 import audio_classifier.train.config.loader as conf_loader
 import numpy as np
-from sklearn.svm import SVC
+from sklearn.base import ClassifierMixin
 
 from ... import train_common
 from .. import classify_common
@@ -62,6 +62,7 @@ def get_config(argv: Namespace):
         LOADER_CONFIG_PATH)
     svc_config: conf_alg.SVCConfig = conf_alg.get_alg_config_from_json(
         SVC_CONFIG_PATH, conf_alg.SVCConfig)
+    classify_common.check_svc_config(svc_config=svc_config)
     pool_config: conf_pool.PoolConfig = conf_pool.get_pool_config_from_json(
         POOL_CONFIG_PATH)
     return dataset_config, mel_spec_config, reshape_config, pool_config, svc_config, loader_config
@@ -71,15 +72,15 @@ def train_svc(curr_val_fold: int,
               dataset: classify_common.ProjDataset,
               svc_config: conf_alg.SVCConfig,
               export_path: str,
-              model_path_stub: str = "val_{:02d}.pkl") -> SVC:
+              model_path_stub: str = "val_{:02d}.pkl") -> ClassifierMixin:
     train_slices, train_labels = classify_common.convert_to_ndarray(
         all_file_spec_projs=dataset.all_file_spec_projs, labels=dataset.labels)
-    svc: SVC = train_svc_np(curr_val_fold=curr_val_fold,
-                            train_slices=train_slices,
-                            train_labels=train_labels,
-                            svc_config=svc_config,
-                            export_path=export_path,
-                            model_path_stub=model_path_stub)
+    svc: ClassifierMixin = train_svc_np(curr_val_fold=curr_val_fold,
+                                        train_slices=train_slices,
+                                        train_labels=train_labels,
+                                        svc_config=svc_config,
+                                        export_path=export_path,
+                                        model_path_stub=model_path_stub)
     return svc
 
 
@@ -88,14 +89,11 @@ def train_svc_np(curr_val_fold: int,
                  train_labels: np.ndarray,
                  svc_config: conf_alg.SVCConfig,
                  export_path: str,
-                 model_path_stub: str = "val_{:02d}.pkl") -> SVC:
+                 model_path_stub: str = "val_{:02d}.pkl") -> ClassifierMixin:
     curr_val_svc_path = path.join(export_path,
                                   str.format(model_path_stub, curr_val_fold))
-    svc = SVC(C=svc_config.C,
-              kernel=svc_config.kernel,
-              degree=svc_config.degree,
-              gamma=svc_config.gamma,
-              coef0=svc_config.coef0)
+    svc = classify_common.get_svc(svc_config=svc_config,
+                                  n_samples=len(train_slices))
     svc.fit(train_slices, train_labels)
     with open(curr_val_svc_path, "wb") as svc_file:
         pickle.dump(svc, svc_file)
@@ -1,10 +1,21 @@
+import os
 from collections import deque
 from dataclasses import dataclass, field
-from typing import MutableSequence, Sequence, Tuple
+from functools import partial
+from typing import Any, Deque, List, Optional, Sequence, Tuple
 
+import audio_classifier.config.preprocessing.reshape as conf_reshape
+import audio_classifier.config.preprocessing.spec as conf_spec
+import audio_classifier.train.collate.base as collate_base
+import audio_classifier.train.collate.preprocessing.spectrogram.reshape as collate_reshape
+import audio_classifier.train.collate.preprocessing.spectrogram.transform as collate_transform
 import audio_classifier.train.config.loader as conf_loader
+import audio_classifier.train.data.dataset.base as dataset_base
 import audio_classifier.train.data.dataset.composite as dataset_composite
+import audio_classifier.train.data.dataset.utils.batch as batch_utils
 import numpy as np
+from joblib import Memory
+from torch.utils.data import ConcatDataset, Dataset
 
 from .. import train_common
 
@@ -46,13 +57,12 @@ def generate_slice_dataset(
     Returns:
         Tuple[SliceDataset, SliceDataset]: (train_dataset, val_dataset)
     """
-    np.seterr(divide="ignore")
-    ret_raw_dataset = train_common.generate_dataset(
-        curr_val_fold=curr_val_fold,
-        dataset_generator=dataset_generator,
-        collate_function=collate_function,
-        loader_config=loader_config)
-    np.seterr(divide="warn")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ret_raw_dataset = train_common.generate_dataset(
+            curr_val_fold=curr_val_fold,
+            dataset_generator=dataset_generator,
+            collate_function=collate_function,
+            loader_config=loader_config)
     ret_dataset: Sequence[SliceDataset] = list()
     for raw_dataset in ret_raw_dataset:
         filenames, flat_slices, sample_freqs, sample_times, labels = raw_dataset
@@ -65,6 +75,141 @@ def generate_slice_dataset(
     return ret_dataset[0], ret_dataset[1]
 
 
+def load_slice_dataset(dataset: Dataset,
+                       mel_spec_config: conf_spec.MelSpecConfig,
+                       reshape_config: conf_reshape.ReshapeConfig,
+                       loader_config: conf_loader.LoaderConfig,
+                       cache_path: Optional[str] = None) -> SliceDataset:
+    """Compute the flat mel-spectrogram slices of a dataset, caching them per folder on disk.
+
+    A `ConcatDataset` is split into its sub datasets, so growing or reordered fold combinations only preprocess the folders that have not been seen yet.
+    Each `FolderDataset` is keyed by its folder, sample rate, filenames, labels, the size and modification time of every file, and the spectrogram and reshape configs. Empty datasets are skipped. The slices of all its files are stored as a single array, so a cached folder is read back as a memmap.
+
+    Args:
+        dataset (Dataset): The dataset to be preprocessed.
+        mel_spec_config (conf_spec.MelSpecConfig): The mel-spectrogram config to be used.
+        reshape_config (conf_reshape.ReshapeConfig): The configuration used to slice spectrogram.
+        loader_config (conf_loader.LoaderConfig): The loader config used to load the dataset.
+        cache_path (Optional[str], optional): The directory of the cache. Defaults to None disable caching.
+
+    Returns:
+        SliceDataset: The slice dataset.
+    """
+    memory = Memory(location=cache_path, mmap_mode="r", verbose=0)
+    cached_preprocess = memory.cache(_preprocess_slices,
+                                     ignore=["dataset", "loader_config"])
+    filenames: List[str] = list()
+    flat_slices: List[np.ndarray] = list()
+    sample_freqs: List[np.ndarray] = list()
+    sample_times: List[np.ndarray] = list()
+    labels: List[int] = list()
+    for sub_dataset in _flatten_concat_dataset(dataset):
+        preprocess = _preprocess_slices
+        dataset_key: Optional[Tuple[Any, ...]] = None
+        if isinstance(sub_dataset, dataset_base.FolderDataset):
+            preprocess = cached_preprocess
+            dataset_key = _get_folder_dataset_key(sub_dataset)
+        curr_filenames, curr_slices, curr_counts, curr_sample_freqs, curr_sample_times, curr_labels = preprocess(
+            dataset_key=dataset_key,
+            mel_spec_config=mel_spec_config,
+            reshape_config=reshape_config,
+            dataset=sub_dataset,
+            loader_config=loader_config)
+        filenames.extend(curr_filenames)
+        # per file views into the (possibly memory mapped) slices
+        flat_slices.extend(
+            np.split(curr_slices, np.cumsum(curr_counts)[:-1], axis=0))
+        sample_freqs.extend(curr_sample_freqs)
+        sample_times.extend(curr_sample_times)
+        labels.extend(curr_labels)
+    return SliceDataset(filenames=filenames,
+                        flat_slices=flat_slices,
+                        sample_freqs=sample_freqs,
+                        sample_times=sample_times,
+                        labels=labels)
+
+
+def _get_folder_dataset_key(
+        dataset: dataset_base.FolderDataset) -> Tuple[Any, ...]:
+    """Identify the content of a folder dataset for the cache.
+
+    The size and modification time of every file are part of the key, so editing an audio file in place invalidates the cached slices.
+    """
+    file_stats: List[Tuple[int, int]] = list()
+    for filename in dataset.filenames:
+        file_stat: os.stat_result = os.stat(
+            os.path.join(dataset.folder_path, filename))
+        file_stats.append((file_stat.st_size, file_stat.st_mtime_ns))
+    return (dataset.folder_path, dataset.sample_rate, tuple(dataset.filenames),
+            tuple(dataset.get_label(i)
+                  for i in range(len(dataset))), tuple(file_stats))
+
+
+def _flatten_concat_dataset(dataset: Dataset) -> List[Dataset]:
+    if len(dataset) == 0:
+        return list()
+    if not isinstance(dataset, ConcatDataset):
+        return [dataset]
+    sub_datasets: List[Dataset] = list()
+    for sub_dataset in dataset.datasets:
+        sub_datasets.extend(_flatten_concat_dataset(sub_dataset))
+    return sub_datasets
+
+
+def _preprocess_slices(
+    dataset_key: Optional[Tuple[Any, ...]],
+    mel_spec_config: conf_spec.MelSpecConfig,
+    reshape_config: conf_reshape.ReshapeConfig, dataset: Dataset,
+    loader_config: conf_loader.LoaderConfig
+) -> Tuple[List[str], np.ndarray, np.ndarray, List[np.ndarray],
+           List[np.ndarray], List[int]]:
+    """Compute the flat slices of a dataset.
+
+    Args:
+        dataset_key (Optional[Tuple[Any, ...]]): Identifies the content of `dataset` for the cache. Unused otherwise.
+        mel_spec_config (conf_spec.MelSpecConfig): The mel-spectrogram config to be used.
+        reshape_config (conf_reshape.ReshapeConfig): The configuration used to slice spectrogram.
+        dataset (Dataset): The dataset to be preprocessed.
+        loader_config (conf_loader.LoaderConfig): The loader config used to load the dataset.
+
+    Returns:
+        filenames (List[str]): (n_files, )
+        slices (np.ndarray): (n_slices, n_freq_bins*slice_size) The flat slices of all files.
+        counts (np.ndarray): (n_files, ) The number of slices of each file.
+        sample_freqs (List[np.ndarray]): (n_files, n_freq_bins)
+        sample_times (List[np.ndarray]): (n_files, n_time_stamps)
+        labels (List[int]): (n_files, )
+    """
+    collate_func: CollateFuncType = collate_base.EnsembleCollateFunction(
+        collate_funcs=[
+            partial(collate_transform.mel_spectrogram_collate,
+                    config=mel_spec_config),
+            partial(collate_reshape.slice_flatten_collate,
+                    config=reshape_config)
+        ])
+    loader = train_common.get_data_loader(dataset=dataset,
+                                          collate_function=collate_func,
+                                          loader_config=loader_config)
+    batches_tmp: Deque[Sequence[Sequence]] = deque()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for batch in loader:
+            batches_tmp.append(batch)
+    filenames, flat_slices, sample_freqs, sample_times, labels = batch_utils.combine_batches(
+        batches_tmp)
+    slice_dataset = SliceDataset(filenames=filenames,
+                                 flat_slices=flat_slices,
+                                 sample_freqs=sample_freqs,
+                                 sample_times=sample_times,
+                                 labels=labels)
+    slices, _ = convert_to_ndarray(slice_dataset=slice_dataset)
+    counts: np.ndarray = np.fromiter(
+        (len(file_slices) for file_slices in flat_slices),
+        dtype=np.int64,
+        count=len(flat_slices))
+    return list(filenames), slices, counts, list(sample_freqs), list(
+        sample_times), list(labels)
+
+
 def convert_to_ndarray(
         slice_dataset: SliceDataset) -> Tuple[np.ndarray, np.ndarray]:
     """Wrap slices and labels as np.ndarray.
@@ -76,15 +221,7 @@ def convert_to_ndarray(
         slices (np.ndarray): (n_slices, n_sample_freq * slice_size) The converted slices.
         labels (np.ndarray): (n_slices, ) The converted labels.
     """
-    slices_seq: MutableSequence[np.ndarray] = deque()
-    labels_seq: MutableSequence[int] = deque()
     assert len(slice_dataset.labels) == len(slice_dataset.flat_slices)
-    for curr_label, curr_file_slices in zip(slice_dataset.labels,
-                                            slice_dataset.flat_slices):
-        slices_seq.extend(curr_file_slices)
-        labels_seq.extend([curr_label] * len(curr_file_slices))
-    slices_seq = list(slices_seq)
-    labels_seq = list(labels_seq)
-    slices: np.ndarray = np.asarray(slices_seq)
-    labels: np.ndarray = np.asarray(labels_seq)
+    slices, labels = train_common.concatenate_file_rows(
+        all_file_rows=slice_dataset.flat_slices, labels=slice_dataset.labels)
     return slices, labels
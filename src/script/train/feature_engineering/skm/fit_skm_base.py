@@ -78,14 +78,16 @@ def try_k_elbow(curr_class_path: str,
     # iterate through all possible metrics to get optimal k value
     METRIC: str = "distortion"
     figure, axes = plt.subplots()
-    skm = SphericalKMeans(n_components=skm_config.n_components,
-                          normalize=skm_config.normalize,
-                          standardize=skm_config.standardize,
-                          whiten=skm_config.whiten,
-                          copy=True,
-                          max_iter=10000)
+    # a loosely converged probe is enough to rank the distortion of each k
+    skm_probe = SphericalKMeans(n_components=skm_config.n_components,
+                                normalize=skm_config.normalize,
+                                standardize=skm_config.standardize,
+                                whiten=skm_config.whiten,
+                                copy=True,
+                                max_iter=100,
+                                tol=1e-3)
     try:
-        visualizer = SphericalKElbowVisualizer(estimator=skm,
+        visualizer = SphericalKElbowVisualizer(estimator=skm_probe,
                                                ax=axes,
                                                k=k_range,
                                                metric=METRIC,
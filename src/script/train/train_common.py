@@ -1,7 +1,8 @@
 from collections import deque
 from functools import partial
 from os import path
-from typing import Any, Callable, Deque, Dict, Optional, Sequence, Tuple, Union
+from typing import (Any, Callable, Deque, Dict, List, Optional, Sequence,
+                    Tuple, Union)
 
 import audio_classifier.config.preprocessing.spec as conf_spec
 import audio_classifier.train.config.dataset as conf_dataset
@@ -11,7 +12,8 @@ import audio_classifier.train.data.dataset.composite as dataset_composite
 import audio_classifier.train.data.dataset.utils.batch as batch_utils
 import audio_classifier.train.data.metadata.query as metadata_query
 import audio_classifier.train.data.metadata.reader as metadata_reader
-from torch.utils.data import DataLoader
+import numpy as np
+from torch.utils.data import DataLoader, Dataset
 
 MetaDataType = Sequence[Dict[str, str]]
 CollateFuncType = Callable[[Union[Sequence[Tuple], Sequence]],
@@ -57,6 +59,72 @@ def get_dataset_generator(
     return dataset_generator
 
 
+def concatenate_file_rows(
+        all_file_rows: Sequence[Sequence[np.ndarray]],
+        labels: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+    """Concatenate the rows of all files and repeat the label of each file for each of its rows.
+
+    If no file has any row, the returned rows are empty with the width of the first empty 2d file array, or 0 if there is none.
+
+    Args:
+        all_file_rows (Sequence[Sequence[np.ndarray]]): (n_files, n_rows, n_cols) The rows of all files.
+        labels (Sequence[int]): (n_files, ) Class labels of all files.
+
+    Returns:
+        rows (np.ndarray): (n_total_rows, n_cols) The rows of all files.
+        row_labels (np.ndarray): (n_total_rows, ) The class label correspond to each row.
+    """
+    counts: np.ndarray = np.fromiter(
+        (len(file_rows) for file_rows in all_file_rows),
+        dtype=np.int64,
+        count=len(all_file_rows))
+    row_labels: np.ndarray = np.repeat(np.asarray(labels, dtype=np.int64),
+                                       counts)
+    file_rows_list: List[np.ndarray] = [
+        np.stack(file_rows, axis=0)
+        if not isinstance(file_rows, np.ndarray) else file_rows
+        for file_rows, count in zip(all_file_rows, counts) if count > 0
+    ]
+    if len(file_rows_list) == 0:
+        for file_rows in all_file_rows:
+            if isinstance(file_rows, np.ndarray) and file_rows.ndim == 2:
+                return np.empty((0, file_rows.shape[1]),
+                                dtype=file_rows.dtype), row_labels
+        return np.empty((0, 0)), row_labels
+    rows: np.ndarray = np.concatenate(file_rows_list, axis=0)
+    return rows, row_labels
+
+
+def get_data_loader(dataset: Dataset, collate_function: CollateFuncType,
+                    loader_config: conf_loader.LoaderConfig) -> DataLoader:
+    """Create a DataLoader according to the loader config.
+
+    The worker specific options are only passed when `loader_config.num_workers > 0`, since torch rejects them otherwise.
+
+    Args:
+        dataset (Dataset): The dataset to be loaded.
+        collate_function (CollateFuncType): The collate function used to process the time series data.
+        loader_config (conf_loader.LoaderConfig): The loader config used to load the dataset.
+
+    Returns:
+        DataLoader: The created loader.
+    """
+    if loader_config.num_workers > 0:
+        return DataLoader(dataset=dataset,
+                          collate_fn=collate_function,
+                          num_workers=loader_config.num_workers,
+                          batch_size=loader_config.batch_size,
+                          pin_memory=loader_config.pin_memory,
+                          prefetch_factor=loader_config.prefetch_factor,
+                          persistent_workers=loader_config.persistent_workers,
+                          multiprocessing_context=loader_config.
+                          multiprocessing_context)
+    return DataLoader(dataset=dataset,
+                      collate_fn=collate_function,
+                      num_workers=0,
+                      batch_size=loader_config.batch_size)
+
+
 def generate_dataset(
     curr_val_fold: int,
     dataset_generator: dataset_composite.KFoldDatasetGenerator,
@@ -77,10 +145,9 @@ def generate_dataset(
         curr_val_fold=curr_val_fold)
     ret_dataset: Deque[Sequence[Sequence[Any]]] = deque()
     for dataset in datasets:
-        loader = DataLoader(dataset=dataset,
-                            collate_fn=collate_function,
-                            num_workers=loader_config.num_workers,
-                            batch_size=loader_config.batch_size)
+        loader = get_data_loader(dataset=dataset,
+                                 collate_function=collate_function,
+                                 loader_config=loader_config)
         batches_tmp: Deque[Sequence[Sequence]] = deque()
         for batch in loader:
             batches_tmp.append(batch)